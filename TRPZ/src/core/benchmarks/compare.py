@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import sys
+
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as file:
+        report = json.load(file)
+    return {(report["benchmark"], result["name"]): result for result in report["results"] if "name" in result}
+
+
+def compare(baseline, current, threshold):
+    rows = []
+    for key, result in current.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        for field in ("files_per_second", "mb_per_second"):
+            if not previous.get(field) or field not in result:
+                continue
+            change = result[field] / previous[field] - 1
+            rows.append({
+                "benchmark": key[0],
+                "name": key[1],
+                "metric": field,
+                "baseline": previous[field],
+                "current": result[field],
+                "change": change,
+                "regression": change < -threshold,
+            })
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Порівняння двох звітів бенчмарків")
+    parser.add_argument("baseline", type=str, help="Звіт попереднього релізу (JSON)")
+    parser.add_argument("current", type=str, help="Звіт поточної версії (JSON)")
+    parser.add_argument("-t", "--threshold", type=float, default=0.1,
+                        help="Допустиме падіння пропускної здатності (за замовчуванням: 0.1 - 10%%)")
+    args = parser.parse_args()
+
+    rows = compare(load_results(args.baseline), load_results(args.current), args.threshold)
+    print(json.dumps(rows, ensure_ascii=False, indent=2))
+    for row in rows:
+        if row["regression"]:
+            print(f"Регресія: {row['benchmark']}/{row['name']} {row['metric']} {row['change']:+.1%}", file=sys.stderr)
+    sys.exit(1 if any(row["regression"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import zipfile
+from email.message import EmailMessage
+from xml.sax.saxutils import escape
+
+DEFAULT_KEYWORDS = ["пароль", "admin", "confidential"]
+ATTACHMENT_TYPES = ("txt", "docx", "pdf", "csv", "xml", "xlsx")
+WORDS = (
+    "report meeting budget invoice schedule project client delivery update review contract agenda "
+    "summary account balance quarter release server backup network policy request approval draft "
+    "звіт зустріч бюджет рахунок графік проєкт клієнт доставка оновлення договір порядок підсумок"
+).split()
+ASCII_WORDS = [word for word in WORDS if word.isascii()]
+MIME_TYPES = {
+    "txt": ("text", "plain"),
+    "csv": ("text", "csv"),
+    "xml": ("application", "xml"),
+    "pdf": ("application", "pdf"),
+    "docx": ("application", "vnd.openxmlformats-officedocument.wordprocessingml.document"),
+    "xlsx": ("application", "vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+LINE_WORDS = 12
+
+
+def make_lines(rng, size, keywords, density, ascii_only=False):
+    words = ASCII_WORDS if ascii_only else WORDS
+    candidates = [keyword for keyword in keywords if keyword.isascii()] if ascii_only else list(keywords)
+    inserted = [keyword for keyword in candidates if rng.random() < density]
+    lines = []
+    length = 0
+    while length < size or not lines:
+        line = " ".join(rng.choice(words) for _ in range(LINE_WORDS))
+        lines.append(line)
+        length += len(line.encode("utf-8")) + 1
+    for keyword in inserted:
+        position = rng.randrange(len(lines))
+        lines[position] = f"{lines[position]} {keyword}"
+    return lines, inserted
+
+
+def build_txt(lines):
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def build_csv(lines):
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(["id", "first", "second"])
+    for number, line in enumerate(lines, 1):
+        words = line.split(" ")
+        half = len(words) // 2
+        writer.writerow([number, " ".join(words[:half]), " ".join(words[half:])])
+    return output.getvalue().encode("utf-8")
+
+
+def build_xml(lines):
+    records = "".join(f'<record id="{number}">{escape(line)}</record>\n' for number, line in enumerate(lines, 1))
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<records>\n{records}</records>\n'.encode("utf-8")
+
+
+def build_zip(parts):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, content in parts:
+            archive.writestr(name, content)
+    return output.getvalue()
+
+
+def build_docx(lines):
+    paragraphs = "".join(f"<w:p><w:r><w:t>{escape(line)}</w:t></w:r></w:p>" for line in lines)
+    return build_zip([
+        ("[Content_Types].xml",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/word/document.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+         '</Types>'),
+        ("_rels/.rels",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" Target="word/document.xml" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+         '</Relationships>'),
+        ("word/document.xml",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+         f'<w:body>{paragraphs}</w:body></w:document>'),
+    ])
+
+
+def build_xlsx(lines):
+    rows = "".join(
+        f'<row r="{number}">' + "".join(
+            f'<c r="{column}{number}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+            for column, value in zip("AB", (str(number), line))
+        ) + "</row>"
+        for number, line in enumerate(lines, 1)
+    )
+    return build_zip([
+        ("[Content_Types].xml",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+         '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+         '<Default Extension="xml" ContentType="application/xml"/>'
+         '<Override PartName="/xl/workbook.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+         '<Override PartName="/xl/worksheets/sheet1.xml" '
+         'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+         '</Types>'),
+        ("_rels/.rels",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" Target="xl/workbook.xml" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+         '</Relationships>'),
+        ("xl/workbook.xml",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+         'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+         '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+        ("xl/_rels/workbook.xml.rels",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+         '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+         'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+         '</Relationships>'),
+        ("xl/worksheets/sheet1.xml",
+         '<?xml version="1.0" encoding="UTF-8"?>'
+         '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+         f'<sheetData>{rows}</sheetData></worksheet>'),
+    ])
+
+
+def pdf_string(line):
+    return "(" + line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def build_pdf(lines, lines_per_page=60):
+    pages = [lines[start:start + lines_per_page] for start in range(0, len(lines), lines_per_page)] or [[]]
+    objects = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in pages:
+        text = " T* ".join(f"{pdf_string(line)} Tj" for line in page)
+        stream = f"BT /F1 9 Tf 11 TL 36 806 Td {text} ET".encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects)
+        )
+        page_ids.append(len(objects))
+    objects[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{page_id} 0 R" for page_id in page_ids).encode("ascii")
+    objects[1] = b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(page_ids)
+
+    output = io.BytesIO()
+    output.write(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(output.tell())
+        output.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+    xref = output.tell()
+    output.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+    for offset in offsets:
+        output.write(b"%010d 00000 n \n" % offset)
+    output.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+    return output.getvalue()
+
+
+BUILDERS = {
+    "txt": build_txt,
+    "csv": build_csv,
+    "xml": build_xml,
+    "docx": build_docx,
+    "xlsx": build_xlsx,
+    "pdf": build_pdf,
+}
+
+
+def make_document(rng, extension, size, keywords, density):
+    lines, inserted = make_lines(rng, size, keywords, density, ascii_only=extension == "pdf")
+    return BUILDERS[extension](lines), inserted
+
+
+def make_email(rng, number, body_size, attachment_size, attachments, types, keywords, density):
+    lines, inserted = make_lines(rng, body_size, keywords, density)
+    message = EmailMessage()
+    message["From"] = f"sender{number % 17}@example.com"
+    message["To"] = "inbox@example.com"
+    message["Subject"] = f"Benchmark message {number}"
+    message.set_content("\n".join(lines) + "\n")
+    documents = [inserted]
+    for position in range(attachments):
+        extension = rng.choice(types)
+        content, inserted = make_document(rng, extension, attachment_size, keywords, density)
+        maintype, subtype = MIME_TYPES[extension]
+        message.add_attachment(content, maintype=maintype, subtype=subtype,
+                               filename=f"attachment-{number}-{position}.{extension}")
+        documents.append(inserted)
+    return message.as_bytes(), documents
+
+
+def nest_archive(name, members, depth):
+    content = build_zip(members)
+    for level in range(1, depth):
+        content = build_zip([(f"level-{level}-{name}", content)])
+    return content
+
+
+def generate_corpus(directory, emails=200, body_size=2048, attachment_size=16384, attachments=2,
+                    types=ATTACHMENT_TYPES, keywords=DEFAULT_KEYWORDS, density=0.1, archived=0.0, per_archive=20,
+                    nesting=2, maildir=0.05, seed=1):
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    if maildir:
+        for folder in ("cur", "new", "tmp"):
+            os.makedirs(os.path.join(directory, "Maildir", folder), exist_ok=True)
+    expected = {keyword: 0 for keyword in keywords}
+    total_size = 0
+    archived_messages = []
+    maildir_messages = 0
+    for number in range(1, emails + 1):
+        content, documents = make_email(rng, number, body_size, attachment_size, attachments, types, keywords,
+                                        density)
+        for inserted in documents:
+            for keyword in inserted:
+                expected[keyword] += 1
+        name = f"message-{number:06d}.eml"
+        if rng.random() < archived:
+            archived_messages.append((name, content))
+            continue
+        if maildir and rng.random() < maildir:
+            maildir_messages += 1
+            name = os.path.join("Maildir", "cur", f"{number:06d}.benchmark")
+        with open(os.path.join(directory, name), "wb") as file:
+            file.write(content)
+        total_size += len(content)
+
+    archives = 0
+    for start in range(0, len(archived_messages), per_archive):
+        archives += 1
+        content = nest_archive(f"archive-{archives:04d}.zip", archived_messages[start:start + per_archive], nesting)
+        with open(os.path.join(directory, f"archive-{archives:04d}.zip"), "wb") as file:
+            file.write(content)
+        total_size += len(content)
+
+    manifest = {
+        "seed": seed,
+        "emails": emails,
+        "archived_emails": len(archived_messages),
+        "archives": archives,
+        "maildir_emails": maildir_messages,
+        "nesting": nesting,
+        "body_size": body_size,
+        "attachment_size": attachment_size,
+        "attachments": attachments,
+        "types": list(types),
+        "density": density,
+        "keywords": list(keywords),
+        "bytes": total_size,
+        "expected_hits": expected,
+    }
+    with open(os.path.join(directory, "manifest.json"), "w", encoding="utf-8") as file:
+        json.dump(manifest, file, ensure_ascii=False, indent=2)
+    with open(os.path.join(directory, "keywords.lst"), "w", encoding="utf-8") as file:
+        file.write(",".join(keywords))
+    return manifest
+
+
+def load_manifest(directory):
+    with open(os.path.join(directory, "manifest.json"), "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def add_corpus_arguments(parser):
+    parser.add_argument("--emails", type=int, default=200, help="Кількість листів")
+    parser.add_argument("--body-size", type=int, default=2048, help="Розмір тексту листа в байтах")
+    parser.add_argument("--attachment-size", type=int, default=16384, help="Розмір тексту вкладення в байтах")
+    parser.add_argument("--attachments", type=int, default=2, help="Кількість вкладень у кожному листі")
+    parser.add_argument("--types", type=str, default=",".join(ATTACHMENT_TYPES),
+                        help="Типи вкладень через кому")
+    parser.add_argument("--keywords", type=str, default=",".join(DEFAULT_KEYWORDS),
+                        help="Ключові слова через кому")
+    parser.add_argument("--density", type=float, default=0.1,
+                        help="Ймовірність появи кожного ключового слова в документі (0..1)")
+    parser.add_argument("--archived", type=float, default=0.0,
+                        help="Частка листів, що потрапляють у вкладені ZIP-архіви (0..1)")
+    parser.add_argument("--per-archive", type=int, default=20, help="Кількість листів в одному архіві")
+    parser.add_argument("--nesting", type=int, default=2, help="Глибина вкладення ZIP-архівів")
+    parser.add_argument("--maildir", type=float, default=0.05,
+                        help="Частка листів, що потрапляють у теку Maildir з порожніми new/ та tmp/ (0..1)")
+    parser.add_argument("--seed", type=int, default=1, help="Початкове значення генератора")
+
+
+def corpus_options(args):
+    return {
+        "emails": args.emails,
+        "body_size": args.body_size,
+        "attachment_size": args.attachment_size,
+        "attachments": args.attachments,
+        "types": [extension for extension in args.types.split(",") if extension],
+        "keywords": [keyword for keyword in args.keywords.split(",") if keyword],
+        "density": args.density,
+        "archived": args.archived,
+        "per_archive": args.per_archive,
+        "nesting": args.nesting,
+        "maildir": args.maildir,
+        "seed": args.seed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Генерація тестового набору листів для бенчмарків")
+    parser.add_argument("directory", type=str, help="Тека для згенерованих листів")
+    add_corpus_arguments(parser)
+    args = parser.parse_args()
+    manifest = generate_corpus(args.directory, **corpus_options(args))
+    print(json.dumps(manifest, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
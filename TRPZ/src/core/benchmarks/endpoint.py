@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import argparse
+import io
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import zipfile
+from corpus import add_corpus_arguments, corpus_options, generate_corpus, load_manifest
+from report import make_report, throughput, use_server_modules, write_report
+
+
+def zip_corpus(directory):
+    output = io.BytesIO()
+    with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED) as archive:
+        for root, dirs, files in os.walk(directory):
+            if not dirs and not files:
+                archive.write(root, os.path.relpath(root, directory))
+            for file_name in files:
+                if file_name in ("manifest.json", "keywords.lst"):
+                    continue
+                path = os.path.join(root, file_name)
+                archive.write(path, os.path.relpath(path, directory))
+    return output.getvalue()
+
+
+def count_hits(response_text, stream):
+    if not stream:
+        return sum(1 for line in json.loads(response_text)["log"].splitlines() if line)
+    records = [json.loads(line) for line in response_text.splitlines() if line]
+    return sum(1 for record in records if record["type"] == "hit")
+
+
+def open_client(url):
+    if url:
+        import requests
+        session = requests.Session()
+        return session, url.rstrip("/") + "/process-directory/"
+    use_server_modules()
+    from fastapi.testclient import TestClient
+    import server
+    return TestClient(server.app), "/process-directory/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк ендпоінту /process-directory/")
+    parser.add_argument("--url", type=str,
+                        help="Адреса запущеного сервера (за замовчуванням: застосунок у поточному процесі)")
+    parser.add_argument("--corpus", type=str,
+                        help="Тека з уже згенерованим набором листів (за замовчуванням: згенерувати тимчасовий)")
+    add_corpus_arguments(parser)
+    parser.add_argument("--stream", action='store_true', help="Отримувати результати потоком NDJSON")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="Кількість повторів, береться медіана")
+    parser.add_argument("-o", "--output", type=str, help="Файл для збереження результатів у форматі JSON")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_endpoint_")
+    try:
+        corpus_dir = args.corpus or os.path.join(work_dir, "corpus")
+        manifest = load_manifest(corpus_dir) if args.corpus else generate_corpus(corpus_dir, **corpus_options(args))
+        archive = zip_corpus(corpus_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    client, endpoint = open_client(args.url)
+    timings = []
+    with client:
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            response = client.post(
+                endpoint,
+                files={"archive": ("corpus.zip", archive, "application/zip")},
+                data={"keywords": ",".join(manifest["keywords"]), "stream": "true" if args.stream else "false"},
+            )
+            response.raise_for_status()
+            text = response.text
+            timings.append(time.perf_counter() - started)
+
+    result = throughput("endpoint/stream" if args.stream else "endpoint", manifest["emails"], len(archive),
+                        statistics.median(timings), hits=count_hits(text, args.stream),
+                        expected_hits=sum(manifest["expected_hits"].values()), rounds=args.rounds)
+    write_report(make_report("endpoint", [result], url=args.url, stream=args.stream,
+                             corpus={key: value for key, value in manifest.items() if key != "expected_hits"}),
+                 args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+import argparse
+import random
+import statistics
+import sys
+import time
+from corpus import ATTACHMENT_TYPES, DEFAULT_KEYWORDS, make_document
+from report import make_report, throughput, use_server_modules, write_report
+
+use_server_modules()
+from extractors import DEFAULT_ENGINE, ENGINES, extract_text  # noqa: E402
+
+
+def measure_extractor(extension, documents, engine, rounds):
+    size = sum(len(document) for document in documents)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for document in documents:
+            extract_text(extension, document, engine)
+        timings.append(time.perf_counter() - started)
+    return throughput(f"extract/{extension}/{engine}", len(documents), size, statistics.median(timings),
+                      extension=extension, engine=engine, rounds=rounds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Швидкість видобування тексту для кожного типу файлів")
+    parser.add_argument("--files", type=int, default=50, help="Кількість документів кожного типу")
+    parser.add_argument("--size", type=int, default=65536, help="Розмір тексту документа в байтах")
+    parser.add_argument("--types", type=str, default=",".join(ATTACHMENT_TYPES), help="Типи файлів через кому")
+    parser.add_argument("--engines", type=str, default=DEFAULT_ENGINE,
+                        help=f"Режими розбору через кому ({', '.join(ENGINES)})")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="Кількість повторів, береться медіана")
+    parser.add_argument("--seed", type=int, default=1, help="Початкове значення генератора")
+    parser.add_argument("-o", "--output", type=str, help="Файл для збереження результатів у форматі JSON")
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    results = []
+    for extension in [extension for extension in args.types.split(",") if extension]:
+        documents = [make_document(rng, extension, args.size, DEFAULT_KEYWORDS, 0.5)[0] for _ in range(args.files)]
+        for engine in [engine for engine in args.engines.split(",") if engine]:
+            try:
+                results.append(measure_extractor(extension, documents, engine, args.rounds))
+            except Exception as e:
+                results.append({"name": f"extract/{extension}/{engine}", "extension": extension, "engine": engine,
+                                "error": f"{type(e).__name__}: {e}"})
+
+    write_report(make_report("extraction", results, files=args.files, size=args.size, rounds=args.rounds,
+                             seed=args.seed), args.output)
+    sys.exit(1 if any("error" in result for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
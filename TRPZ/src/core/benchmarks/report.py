@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVER_DIR = os.path.join(os.path.dirname(BENCHMARKS_DIR), "server")
+MB = 1024 * 1024
+
+
+def use_server_modules():
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+
+
+def git_revision():
+    try:
+        result = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR, capture_output=True,
+                                text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() or None
+
+
+def throughput(name, files, size, seconds, **extra):
+    result = {
+        "name": name,
+        "files": files,
+        "bytes": size,
+        "seconds": seconds,
+        "files_per_second": files / seconds if seconds else 0.0,
+        "mb_per_second": size / MB / seconds if seconds else 0.0,
+    }
+    result.update(extra)
+    return result
+
+
+def make_report(benchmark, results, **parameters):
+    return {
+        "benchmark": benchmark,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "parameters": parameters,
+        "results": results,
+    }
+
+
+def write_report(report, output=None):
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    print(text)
+    if output:
+        with open(output, "w", encoding="utf-8") as file:
+            file.write(text)
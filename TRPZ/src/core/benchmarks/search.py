@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import argparse
+import asyncio
+import contextlib
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from corpus import add_corpus_arguments, corpus_options, generate_corpus, load_manifest
+from report import make_report, throughput, use_server_modules, write_report
+
+use_server_modules()
+from archives import ArchiveWalker  # noqa: E402
+from core2 import DEFAULT_CONCURRENCY, search_keywords_in_emails  # noqa: E402
+from matcher import install_matcher  # noqa: E402
+from metrics import metrics  # noqa: E402
+
+
+def count_lines(path):
+    if not os.path.exists(path):
+        return 0
+    with open(path, "r", encoding="utf-8") as file:
+        return sum(1 for _ in file)
+
+
+def run_search(corpus_dir, work_dir, keywords, executor, concurrency, save_attachments):
+    log_file = os.path.join(work_dir, "log.txt")
+    error_file = os.path.join(work_dir, "errors.txt")
+    for path in (log_file, error_file):
+        if os.path.exists(path):
+            os.remove(path)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        asyncio.run(search_keywords_in_emails(corpus_dir, log_file, error_file, keywords,
+                                              os.path.join(work_dir, "attachments"), save_attachments, executor,
+                                              concurrency, walker=ArchiveWalker()))
+    return time.perf_counter() - started, count_lines(log_file), count_lines(error_file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Наскрізний бенчмарк search_keywords_in_emails")
+    parser.add_argument("--corpus", type=str,
+                        help="Тека з уже згенерованим набором листів (за замовчуванням: згенерувати тимчасовий)")
+    add_corpus_arguments(parser)
+    parser.add_argument("-w", "--workers", type=int, default=0, help="Кількість процесів для розбору файлів")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help="Кількість файлів, що обробляються одночасно")
+    parser.add_argument("--save-attachments", action='store_true', help="Зберігати вкладення зі збігами")
+    parser.add_argument("-r", "--rounds", type=int, default=3, help="Кількість повторів, береться медіана")
+    parser.add_argument("--metrics", action='store_true', help="Додати до звіту метрики останнього повтору")
+    parser.add_argument("-o", "--output", type=str, help="Файл для збереження результатів у форматі JSON")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_search_")
+    executor = None
+    try:
+        corpus_dir = args.corpus or os.path.join(work_dir, "corpus")
+        manifest = load_manifest(corpus_dir) if args.corpus else generate_corpus(corpus_dir, **corpus_options(args))
+        if args.workers > 0:
+            executor = ProcessPoolExecutor(max_workers=args.workers, initializer=install_matcher,
+                                           initargs=(manifest["keywords"],))
+        timings = []
+        for round_number in range(args.rounds):
+            if args.metrics and round_number == args.rounds - 1:
+                metrics.enable()
+            seconds, hits, errors = run_search(corpus_dir, work_dir, manifest["keywords"], executor,
+                                               args.concurrency, args.save_attachments)
+            timings.append(seconds)
+    finally:
+        if executor is not None:
+            executor.shutdown()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    result = throughput("search", manifest["emails"], manifest["bytes"], statistics.median(timings),
+                        hits=hits, expected_hits=sum(manifest["expected_hits"].values()), errors=errors,
+                        rounds=args.rounds)
+    if args.metrics:
+        result["metrics"] = metrics.summary()
+    write_report(make_report("search", [result], workers=args.workers, concurrency=args.concurrency,
+                             corpus={key: value for key, value in manifest.items() if key != "expected_hits"}),
+                 args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+SERVER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "server")
+HEAVY_MODULES = ["pandas", "fitz", "docx", "pyfiglet", "openpyxl"]
+MODULES = {"core2": 0.5, "server": 1.0}
+
+
+def measure_import(module, runs):
+    script = (
+        "import json, sys, time\n"
+        f"sys.path.insert(0, {SERVER_DIR!r})\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps({{'seconds': elapsed, 'heavy': [m for m in {HEAVY_MODULES!r} if m in sys.modules]}}))\n"
+    )
+    timings = []
+    heavy = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        with tempfile.TemporaryDirectory() as work_directory:
+            result = subprocess.run([sys.executable, "-c", script], cwd=work_directory, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if result.returncode != 0:
+            return {"module": module, "error": result.stderr.strip().splitlines()[-1:]}
+        data = json.loads(result.stdout.strip().splitlines()[-1])
+        timings.append({"import": data["seconds"], "process": wall})
+        heavy = data["heavy"]
+    return {
+        "module": module,
+        "runs": runs,
+        "import_seconds": statistics.median(timing["import"] for timing in timings),
+        "process_seconds": statistics.median(timing["process"] for timing in timings),
+        "heavy_modules": heavy,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Вимірювання часу запуску core2 та сервера")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="Кількість запусків для кожного модуля")
+    parser.add_argument("--max-seconds", type=float,
+                        help="Максимально допустимий медіанний час імпорту модуля "
+                             f"(типово: {', '.join(f'{module} {limit}' for module, limit in MODULES.items())})")
+    parser.add_argument("-o", "--output", type=str, help="Файл для збереження результатів у форматі JSON")
+    args = parser.parse_args()
+
+    results = [measure_import(module, args.runs) for module in MODULES]
+    report = {"benchmark": "startup", "python": sys.version.split()[0], "results": results}
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+
+    failed = [
+        result for result in results
+        if "error" in result or result["heavy_modules"]
+        or result["import_seconds"] > (args.max_seconds or MODULES[result["module"]])
+    ]
+    for result in failed:
+        print(f"Регресія часу запуску: {result['module']}", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
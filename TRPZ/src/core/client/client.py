@@ -3,10 +3,26 @@ import logging
 from abc import ABC, abstractmethod
 from datetime import datetime
 from functools import wraps
+import json
 import requests
 import os
-import zipfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin
+from requests.adapters import HTTPAdapter
 from generatelog import generate_html_log
+from hashcache import HASH_CACHE_PATH, HashCache
+from shards import DEFAULT_SHARD_SIZE, balance_shards, merge_results
+from streamzip import DEFAULT_COMPRESSION_LEVEL, StreamingZipWriter
+
+MANIFEST_NAME = 'manifest.json'
+MAILDIR_FOLDERS = ('cur', 'new')
+DEFAULT_PARALLEL = 4
+DEFAULT_RETRIES = 3
+RETRY_BACKOFF = 0.5
+RETRY_STATUSES = (429, 502, 503, 504)
 
 logging.basicConfig(filename='app.log', level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -50,8 +66,15 @@ class SendDirectoryCommand(Command):
 
 
 class DirectorySenderProxy:
-    def __init__(self, url):
+    def __init__(self, url, stream=False, compression_level=DEFAULT_COMPRESSION_LEVEL, workers=None,
+                 incremental=False, cache_path=HASH_CACHE_PATH, shard_size=DEFAULT_SHARD_SIZE,
+                 parallel=DEFAULT_PARALLEL, retries=DEFAULT_RETRIES):
         self.url = url
+        self.stream = stream
+        self.incremental = incremental
+        self.cache_path = cache_path
+        self.uploader = ShardUploader(create_session(parallel), compression_level, workers, shard_size, parallel,
+                                      retries)
 
     @log_to_file_decorator
     def send_directory(self, directory_path, keywords_file):
@@ -76,35 +99,212 @@ class DirectorySenderProxy:
             return
 
         print('\033[92mПеревірка пройшла успішно. Відправлення даних на сервер...\033[0m')
-        send_directory_to_server(self.url, directory_path, keywords_file)
+        if self.incremental:
+            send_directory_manifest(self.url, directory_path, keywords_file, self.stream, self.uploader,
+                                    self.cache_path)
+        else:
+            send_directory_to_server(self.url, directory_path, keywords_file, self.stream, self.uploader)
 
 def read_keywords(file_path):
     with open(file_path, 'r', encoding='utf-8') as file:
         return file.read().strip().split(',')
 
-def create_zip_archive(directory_path, output_path):
-    with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-        for root, dirs, files in os.walk(directory_path):
-            for file in files:
-                zipf.write(os.path.join(root, file), os.path.relpath(os.path.join(root, file), os.path.join(directory_path,
-                                                                                                            '../../..')))
+def iter_directory(directory_path):
+    base_path = os.path.join(directory_path, '../../..')
+    for root, dirs, files in os.walk(directory_path):
+        for file in files:
+            path = os.path.join(root, file)
+            yield path, os.path.relpath(path, base_path)
+
+def iter_empty_directories(directory_path):
+    base_path = os.path.join(directory_path, '../../..')
+    for root, dirs, files in os.walk(directory_path):
+        if not dirs and not files:
+            yield None, os.path.relpath(root, base_path) + '/'
+
+def file_kind(path):
+    folder = os.path.dirname(path)
+    maildir = os.path.basename(folder) in MAILDIR_FOLDERS and all(
+        os.path.isdir(os.path.join(os.path.dirname(folder), name)) for name in MAILDIR_FOLDERS)
+    return 'email' if path.endswith('.eml') or maildir else 'file'
+
+def multipart_body(boundary, fields, file_field, filename, chunks):
+    for name, value in fields.items():
+        yield f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n{value}\r\n'.encode('utf-8')
+    yield (f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+           'Content-Type: application/zip\r\n\r\n').encode('utf-8')
+    yield from chunks
+    yield f'\r\n--{boundary}--\r\n'.encode('utf-8')
+
+def file_size(path):
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+def create_session(pool_size=DEFAULT_PARALLEL):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def archive_request(data, members, compression_level=DEFAULT_COMPRESSION_LEVEL, workers=None):
+    archive = StreamingZipWriter(members, compression_level, workers)
+    boundary = uuid.uuid4().hex
+    body = multipart_body(boundary, data, 'archive', 'archive.zip', archive)
+    return {'data': body, 'headers': {'Content-Type': f'multipart/form-data; boundary={boundary}'}}
+
+def post_with_retries(session, url, build_request, retries=DEFAULT_RETRIES, **kwargs):
+    for attempt in range(retries + 1):
+        try:
+            response = session.post(url, **build_request(), **kwargs)
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                return response
+            response.close()
+        except (requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                raise
+            logging.warning(f"Повторна спроба запиту {url}: {e}")
+        time.sleep(RETRY_BACKOFF * 2 ** attempt)
+
+def check_response(response):
+    if response.status_code < 400:
+        return
+    try:
+        body = response.json()
+    except ValueError:
+        body = None
+    if not isinstance(body, dict) or not body.get('detail'):
+        response.raise_for_status()
+    raise requests.exceptions.HTTPError(f"{response.status_code}: {body['detail']}", response=response)
+
+class ShardUploader:
+    def __init__(self, session=None, compression_level=DEFAULT_COMPRESSION_LEVEL, workers=None,
+                 shard_size=DEFAULT_SHARD_SIZE, parallel=DEFAULT_PARALLEL, retries=DEFAULT_RETRIES):
+        self.session = session if session is not None else create_session(parallel)
+        self.compression_level = compression_level
+        self.workers = workers
+        self.shard_size = shard_size
+        self.parallel = parallel
+        self.retries = retries
+
+    def post(self, url, build_request, **kwargs):
+        return post_with_retries(self.session, url, build_request, self.retries, **kwargs)
+
+    def post_archive(self, url, data, members, workers=None, **kwargs):
+        members = list(members)
+        return self.post(url, lambda: archive_request(data, members, self.compression_level,
+                                                      workers or self.workers), **kwargs)
 
-def send_directory_to_server(url, directory_path, keywords_file):
-    zip_path = 'temp_archive.zip'
-    create_zip_archive(directory_path, zip_path)
+    def upload_shards(self, url, shards, stream=False):
+        running = max(1, min(self.parallel, len(shards)))
+        workers = max(1, (self.workers or os.cpu_count() or 1) // running)
+        print_lock = threading.Lock()
 
+        def upload(index, data, members):
+            if stream:
+                with self.post_archive(url, data, members, workers, stream=True) as response:
+                    check_response(response)
+                    result = print_streamed_log(response.iter_lines(), print_lock)
+            else:
+                response = self.post_archive(url, data, members, workers)
+                check_response(response)
+                result = response.json()
+            with print_lock:
+                print(f'Частину {index + 1} з {len(shards)} оброблено', flush=True)
+            return result
+
+        results = []
+        with ThreadPoolExecutor(max_workers=running) as executor:
+            futures = [executor.submit(upload, index, data, members) for index, (data, members) in enumerate(shards)]
+            for index, future in enumerate(futures):
+                try:
+                    results.append(future.result())
+                except (requests.exceptions.RequestException, ValueError) as e:
+                    logging.error(f"Помилка відправлення частини {index + 1}: {e}")
+                    if stream:
+                        with print_lock:
+                            print(f"\033[91mПомилка відправлення частини {index + 1}: {e}\033[0m", flush=True)
+                    results.append({'errors': f'Помилка відправлення частини {index + 1}: {e}\n'})
+        return merge_results(results)
+
+def send_directory_to_server(url, directory_path, keywords_file, stream=False, uploader=None):
+    uploader = uploader if uploader is not None else ShardUploader()
     keywords = ','.join(read_keywords(keywords_file))
+    data = {'keywords': keywords}
+    files = list(iter_directory(directory_path))
+    folders = list(iter_empty_directories(directory_path))
     try:
-        with open(zip_path, 'rb') as zip_file:
-            files = {'archive': zip_file}
-            data = {'keywords': keywords}
-            response = requests.post(url, files=files, data=data)
-            response_data = response.json()
-            print_formatted_log(response_data)
-    except requests.exceptions.JSONDecodeError:
+        shards = balance_shards(((file_size(path), (path, name)) for path, name in files), uploader.shard_size)
+        if stream:
+            data['stream'] = 'true'
+            write_html_log(uploader.upload_shards(url, [(data, folders + shard) for shard in shards], stream=True))
+        else:
+            print_formatted_log(uploader.upload_shards(url, [(data, folders + shard) for shard in shards]))
+    except (requests.exceptions.JSONDecodeError, json.JSONDecodeError):
         print("Помилка: Неможливо отримати JSON-відповідь від сервера.")
-    finally:
-        os.remove(zip_path)
+
+def send_directory_manifest(url, directory_path, keywords_file, stream=False, uploader=None,
+                            cache_path=HASH_CACHE_PATH):
+    uploader = uploader if uploader is not None else ShardUploader()
+    keywords = read_keywords(keywords_file)
+    files = list(iter_directory(directory_path))
+    cache = HashCache(cache_path)
+    hashes = cache.hash_files([path for path, _ in files], uploader.workers)
+    cache.save()
+
+    groups = {}
+    for path, name in files:
+        if path in hashes:
+            groups.setdefault((hashes[path], file_kind(path)), []).append((path, name))
+
+    try:
+        response = uploader.post(urljoin(url, '/manifest/'),
+                                 lambda: {'json': {'keywords': keywords, 'files': [
+                                     {'sha256': sha256, 'kind': kind} for sha256, kind in groups]}})
+        if response.status_code == 404:
+            send_directory_to_server(url, directory_path, keywords_file, stream, uploader)
+            return
+        check_response(response)
+        unknown = {(entry['sha256'], entry['kind']) for entry in response.json()['unknown']}
+
+        shards = []
+        items = ((file_size(group[0][0]) if key in unknown else 0, key) for key, group in groups.items())
+        for shard in balance_shards(items, uploader.shard_size):
+            manifest = [{'path': name, 'sha256': sha256, 'kind': kind}
+                        for sha256, kind in shard for _, name in groups[(sha256, kind)]]
+            members = [(json.dumps(manifest, ensure_ascii=False).encode('utf-8'), MANIFEST_NAME)]
+            members.extend((groups[key][0][0], f'{key[0]}/{key[1]}/{os.path.basename(groups[key][0][1])}')
+                           for key in shard if key in unknown)
+            shards.append(({'keywords': ','.join(keywords)}, members))
+        print(f'Файлів: {sum(len(group) for group in groups.values())}, нових для сервера: {len(unknown)}, '
+              f'частин: {len(shards)}')
+
+        print_formatted_log(uploader.upload_shards(urljoin(url, '/process-manifest/'), shards))
+    except (requests.exceptions.JSONDecodeError, json.JSONDecodeError):
+        print("Помилка: Неможливо отримати JSON-відповідь від сервера.")
+
+
+def print_streamed_log(lines, print_lock=None):
+    print_lock = print_lock if print_lock is not None else threading.Lock()
+    log_entries = []
+    errors = []
+    for line in lines:
+        if not line:
+            continue
+        record = json.loads(line)
+        if record.get('type') == 'hit':
+            log_entries.append(record['line'])
+            with print_lock:
+                print("\033[92m" + record['line'] + "\033[0m", flush=True)
+        elif record.get('type') == 'error':
+            errors.append(record['message'])
+            with print_lock:
+                print("\033[91m" + record['message'].rstrip() + "\033[0m", flush=True)
+
+    return {'log': '\n'.join(log_entries), 'errors': ''.join(errors)}
 
 
 def print_formatted_log(response_data):
@@ -117,7 +317,10 @@ def print_formatted_log(response_data):
     if 'errors' in response_data and response_data['errors'].strip():
         print("\n\033[91m" + response_data['errors'] + "\033[0m")
 
+    write_html_log(response_data)
+
 
+def write_html_log(response_data):
     html_log = generate_html_log(response_data)
     with open('log_output.html', 'w', encoding='utf-8') as file:
         file.write(html_log)
@@ -125,7 +328,11 @@ def print_formatted_log(response_data):
 
 def main():
     url = 'http://localhost:8009/process-directory/'
-    sender_proxy = DirectorySenderProxy(url)
+    compression_level = int(os.environ.get('EMAIL_PARSER_COMPRESSION_LEVEL', DEFAULT_COMPRESSION_LEVEL))
+    parallel = int(os.environ.get('EMAIL_PARSER_PARALLEL', DEFAULT_PARALLEL))
+    incremental = os.environ.get('EMAIL_PARSER_INCREMENTAL', '0') == '1'
+    sender_proxy = DirectorySenderProxy(url, stream=True, compression_level=compression_level,
+                                        incremental=incremental, parallel=parallel)
 
     while True:
         print("Введіть команду:")
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_CACHE_PATH = 'hash_cache.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError as e:
+        logging.error(f"Помилка читання файлу {path}: {e}")
+        return None
+    return digest.hexdigest()
+
+
+class HashCache:
+    def __init__(self, path=HASH_CACHE_PATH):
+        self.path = path
+        self.changed = False
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def lookup(self, path, stat):
+        entry = self.entries.get(os.path.abspath(path))
+        if entry and entry[0] == stat.st_size and entry[1] == stat.st_mtime_ns:
+            return entry[2]
+        return None
+
+    def hash_files(self, paths, workers=None):
+        hashes = {}
+        missing = []
+        for path in paths:
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                logging.error(f"Помилка читання файлу {path}: {e}")
+                continue
+            sha256 = self.lookup(path, stat)
+            if sha256 is None:
+                missing.append((path, stat))
+            else:
+                hashes[path] = sha256
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for (path, stat), sha256 in zip(missing, executor.map(hash_file, [path for path, _ in missing])):
+                if sha256 is None:
+                    continue
+                self.entries[os.path.abspath(path)] = [stat.st_size, stat.st_mtime_ns, sha256]
+                self.changed = True
+                hashes[path] = sha256
+        return hashes
+
+    def save(self):
+        if not self.changed:
+            return
+        temp_path = f'{self.path}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as file:
+                json.dump(self.entries, file)
+            os.replace(temp_path, self.path)
+            self.changed = False
+        except OSError as e:
+            logging.error(f"Помилка збереження кешу хешів {self.path}: {e}")
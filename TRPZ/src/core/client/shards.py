@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+import heapq
+import math
+
+DEFAULT_SHARD_SIZE = 64 * 1024 * 1024
+
+
+def balance_shards(items, shard_size=DEFAULT_SHARD_SIZE):
+    items = list(items)
+    total = sum(size for size, _ in items)
+    count = max(1, min(len(items), math.ceil(total / shard_size)))
+    heap = [(0, index, []) for index in range(count)]
+    for position, (size, _) in sorted(enumerate(items), key=lambda item: item[1][0], reverse=True):
+        load, index, shard = heapq.heappop(heap)
+        shard.append(position)
+        heapq.heappush(heap, (load + size, index, shard))
+    shards = [sorted(shard) for _, _, shard in sorted(heap, key=lambda entry: entry[1]) if shard]
+    return [[items[position][1] for position in shard] for shard in shards]
+
+
+def merge_results(results):
+    log = []
+    errors = []
+    for result in results:
+        if result.get('log', '').strip():
+            log.append(result['log'] if result['log'].endswith('\n') else result['log'] + '\n')
+        if result.get('errors', '').strip():
+            errors.append(result['errors'])
+    return {'message': 'Directory processed', 'log': ''.join(log), 'errors': ''.join(errors)}
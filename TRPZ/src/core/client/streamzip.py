@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import io
+import logging
+import os
+import struct
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+DEFAULT_COMPRESSION_LEVEL = 6
+BLOCK_SIZE = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+STORED_EXTENSIONS = {
+    'pdf', 'docx', 'xlsx', 'pptx', 'odt', 'ods', 'zip', 'gz', 'tgz', 'bz2', 'xz', '7z', 'rar',
+    'jpg', 'jpeg', 'png', 'gif', 'mp3', 'mp4'
+}
+
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+FLAG_DATA_DESCRIPTOR = 0x08
+FLAG_UTF8 = 0x800
+
+
+def is_stored(name, level):
+    return level == 0 or os.path.splitext(name)[1].lstrip('.').lower() in STORED_EXTENSIONS
+
+
+def compress_block(data, level, last):
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+
+
+def dos_datetime(timestamp):
+    date_time = time.localtime(timestamp)
+    year = min(max(date_time.tm_year, 1980), 2107)
+    return ((year - 1980) << 9 | date_time.tm_mon << 5 | date_time.tm_mday,
+            date_time.tm_hour << 11 | date_time.tm_min << 5 | date_time.tm_sec // 2)
+
+
+class ZipEntry:
+    def __init__(self, name, size, mtime, method):
+        self.name = name.replace(os.sep, '/').encode('utf-8')
+        self.flags = FLAG_DATA_DESCRIPTOR | (0 if name.isascii() else FLAG_UTF8)
+        self.size = size
+        self.date, self.time = dos_datetime(mtime)
+        self.method = method
+        self.zip64 = size * 1.01 + 1024 >= ZIP64_LIMIT
+        self.crc = 0
+        self.compressed_size = 0
+        self.offset = 0
+
+    @property
+    def version(self):
+        return 45 if self.zip64 else 20
+
+    def local_header(self):
+        extra = struct.pack('<HHQQ', 1, 16, 0, 0) if self.zip64 else b''
+        sizes = ZIP64_LIMIT if self.zip64 else 0
+        return struct.pack('<IHHHHHIIIHH', 0x04034b50, self.version, self.flags, self.method, self.time, self.date,
+                           0, sizes, sizes, len(self.name), len(extra)) + self.name + extra
+
+    def data_descriptor(self):
+        if self.zip64:
+            return struct.pack('<IIQQ', 0x08074b50, self.crc, self.compressed_size, self.size)
+        return struct.pack('<IIII', 0x08074b50, self.crc, self.compressed_size, self.size)
+
+    def central_header(self):
+        fields = []
+        size, compressed_size, offset = self.size, self.compressed_size, self.offset
+        if size >= ZIP64_LIMIT:
+            fields.append(size)
+            size = ZIP64_LIMIT
+        if compressed_size >= ZIP64_LIMIT:
+            fields.append(compressed_size)
+            compressed_size = ZIP64_LIMIT
+        if offset >= ZIP64_LIMIT:
+            fields.append(offset)
+            offset = ZIP64_LIMIT
+        extra = struct.pack(f'<HH{len(fields)}Q', 1, 8 * len(fields), *fields) if fields else b''
+        version = 45 if fields else self.version
+        return struct.pack('<IHHHHHHIIIHHHHHII', 0x02014b50, version, version, self.flags, self.method, self.time,
+                           self.date, self.crc, compressed_size, size, len(self.name), len(extra), 0, 0, 0, 0,
+                           offset) + self.name + extra
+
+
+class StreamingZipWriter:
+    def __init__(self, members, level=DEFAULT_COMPRESSION_LEVEL, workers=None, block_size=BLOCK_SIZE,
+                 chunk_size=CHUNK_SIZE):
+        self.members = members
+        self.level = level
+        self.workers = workers or min(32, os.cpu_count() or 1)
+        self.block_size = block_size
+        self.chunk_size = chunk_size
+        self.entries = []
+        self.offset = 0
+
+    def __iter__(self):
+        buffer = bytearray()
+        for data in self.records():
+            buffer += data
+            if len(buffer) >= self.chunk_size:
+                yield bytes(buffer)
+                buffer.clear()
+        if buffer:
+            yield bytes(buffer)
+
+    def records(self):
+        self.entries = []
+        self.offset = 0
+        pending = deque()
+        window = self.workers * 2
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for path, name in self.members:
+                for item in self.entry_items(executor, path, name):
+                    pending.append(item)
+                    while len(pending) > window:
+                        yield self.resolve(*pending.popleft())
+            while pending:
+                yield self.resolve(*pending.popleft())
+        yield self.central_directory()
+
+    def open_member(self, source):
+        if isinstance(source, bytes):
+            return io.BytesIO(source), len(source), time.time()
+        file = open(source, 'rb')
+        stat = os.fstat(file.fileno())
+        return file, stat.st_size, stat.st_mtime
+
+    def entry_items(self, executor, path, name):
+        if name.endswith('/'):
+            entry = ZipEntry(name, 0, time.time(), ZIP_STORED)
+            self.entries.append(entry)
+            yield 'header', entry, None
+            yield 'descriptor', entry, None
+            return
+        try:
+            file, size, mtime = self.open_member(path)
+        except OSError as e:
+            logging.error(f"Помилка читання файлу {path}: {e}")
+            return
+        with file:
+            method = ZIP_STORED if is_stored(name, self.level) else ZIP_DEFLATED
+            entry = ZipEntry(name, size, mtime, method)
+            self.entries.append(entry)
+            yield 'header', entry, None
+            remaining = size
+            while True:
+                block = file.read(min(self.block_size, remaining))
+                remaining -= len(block)
+                last = not block or remaining <= 0
+                entry.crc = zlib.crc32(block, entry.crc)
+                if method == ZIP_STORED:
+                    if block:
+                        yield 'data', entry, block
+                else:
+                    yield 'data', entry, executor.submit(compress_block, block, self.level, last)
+                if last:
+                    break
+            entry.size = size - max(remaining, 0)
+            yield 'descriptor', entry, None
+
+    def resolve(self, kind, entry, value):
+        if kind == 'header':
+            entry.offset = self.offset
+            data = entry.local_header()
+        elif kind == 'data':
+            data = value.result() if isinstance(value, Future) else value
+            entry.compressed_size += len(data)
+        else:
+            data = entry.data_descriptor()
+        self.offset += len(data)
+        return data
+
+    def central_directory(self):
+        start = self.offset
+        directory = b''.join(entry.central_header() for entry in self.entries)
+        end = start + len(directory)
+        count = len(self.entries)
+        if count >= 0xFFFF or start >= ZIP64_LIMIT or len(directory) >= ZIP64_LIMIT:
+            directory += struct.pack('<IQHHIIQQQQ', 0x06064b50, 44, 45, 45, 0, 0, count, count, len(directory),
+                                     start)
+            directory += struct.pack('<IIQI', 0x07064b50, 0, end, 1)
+            return directory + struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, 0xFFFF, 0xFFFF, ZIP64_LIMIT, ZIP64_LIMIT,
+                                           0)
+        return directory + struct.pack('<IHHHHIIH', 0x06054b50, 0, 0, count, count, len(directory), start, 0)
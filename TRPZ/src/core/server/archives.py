@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import bz2
+import gzip
+import lzma
+import os
+import posixpath
+import tarfile
+import threading
+import zipfile
+from contextlib import contextmanager
+from functools import partial
+from extractors import CHUNK_SIZE, open_binary
+
+DEFAULT_MAX_DEPTH = 3
+DEFAULT_MAX_MEMBER_SIZE = 256 * 1024 * 1024
+DEFAULT_MAX_TOTAL_SIZE = 2 * 1024 * 1024 * 1024
+DEFAULT_MAX_RATIO = 100
+RATIO_THRESHOLD = 1024 * 1024
+HEADER_SIZE = 512
+CONTAINER_EXTENSIONS = {"docx", "xlsx", "pptx", "odt", "ods", "odp", "epub", "jar"}
+DECOMPRESSORS = {"gzip": gzip.open, "bzip2": bz2.open, "xz": lzma.open}
+COMPRESSED_SUFFIXES = {".gz": "", ".bz2": "", ".xz": "", ".tgz": ".tar", ".tbz2": ".tar", ".txz": ".tar"}
+
+
+class ArchiveError(Exception):
+    pass
+
+
+class ArchiveMember:
+    def __init__(self, name, reader, depth=1, budget=None, folders=frozenset(), email=None):
+        self.name = name
+        self.reader = reader
+        self.depth = depth
+        self.budget = budget
+        self.folders = folders
+        self.email = email
+
+    async def read(self):
+        return await asyncio.to_thread(self.reader)
+
+
+class ArchiveBudget:
+    def __init__(self, limit):
+        self.limit = limit
+        self.used = 0
+        self.lock = threading.Lock()
+
+    def consume(self, name, size):
+        with self.lock:
+            self.used += size
+            if self.used > self.limit:
+                raise ArchiveError(f"Перевищено загальний розмір розпакованих даних: {name}")
+
+
+def archive_kind(head):
+    if head.startswith((b"PK\x03\x04", b"PK\x05\x06")):
+        return "zip"
+    if head.startswith(b"\x1f\x8b"):
+        return "gzip"
+    if head.startswith(b"BZh"):
+        return "bzip2"
+    if head.startswith(b"\xfd7zXZ\x00"):
+        return "xz"
+    if head[257:262] == b"ustar":
+        return "tar"
+    return None
+
+
+def member_name(prefix, name):
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".", "..")]
+    return "/".join([prefix] + parts if prefix else parts)
+
+
+def member_folders(files, directories):
+    folders = set()
+    for folder in [posixpath.dirname(name) for name in files] + list(directories):
+        while folder and folder not in folders:
+            folders.add(folder)
+            folder = posixpath.dirname(folder)
+    return frozenset(folders)
+
+
+def inner_name(name):
+    base, suffix = os.path.splitext(os.path.basename(name))
+    return base + COMPRESSED_SUFFIXES.get(suffix.lower(), "")
+
+
+class ArchiveWalker:
+    def __init__(self, max_depth=DEFAULT_MAX_DEPTH, max_member_size=DEFAULT_MAX_MEMBER_SIZE,
+                 max_total_size=DEFAULT_MAX_TOTAL_SIZE, max_ratio=DEFAULT_MAX_RATIO):
+        self.max_depth = max_depth
+        self.max_member_size = max_member_size
+        self.max_total_size = max_total_size
+        self.max_ratio = max_ratio
+
+    def can_expand(self, depth):
+        return depth < self.max_depth
+
+    def kind(self, name, source):
+        if os.path.splitext(name)[1].lstrip(".").lower() in CONTAINER_EXTENSIONS:
+            return None
+        if isinstance(source, (bytes, bytearray)):
+            return archive_kind(bytes(source[:HEADER_SIZE]))
+        with open(source, "rb") as file:
+            return archive_kind(file.read(HEADER_SIZE))
+
+    @contextmanager
+    def open(self, name, source, depth=0, prefix=None, budget=None):
+        kind = self.kind(name, source)
+        if kind is None:
+            raise ArchiveError(f"Невідомий формат архіву: {name}")
+        if not self.can_expand(depth):
+            raise ArchiveError(f"Перевищено глибину вкладення архівів: {name}")
+        prefix = name if prefix is None else prefix
+        budget = budget if budget is not None else ArchiveBudget(self.max_total_size)
+
+        if kind in DECOMPRESSORS:
+            reader = partial(self.decompress, kind, name, source, budget)
+            yield [ArchiveMember(member_name(prefix, inner_name(name)), reader, depth + 1, budget)]
+            return
+
+        with open_binary(source) as stream:
+            if kind == "zip":
+                with zipfile.ZipFile(stream) as archive:
+                    files = [info for info in archive.infolist() if not info.is_dir()]
+                    folders = member_folders([member_name(prefix, info.filename) for info in files],
+                                             [member_name(prefix, info.filename)
+                                              for info in archive.infolist() if info.is_dir()])
+                    yield [
+                        ArchiveMember(member_name(prefix, info.filename),
+                                      partial(self.read_zip_member, archive, info, budget), depth + 1, budget,
+                                      folders)
+                        for info in files
+                    ]
+            else:
+                with tarfile.open(fileobj=stream, mode="r:") as archive:
+                    lock = threading.Lock()
+                    files = [info for info in archive.getmembers() if info.isfile()]
+                    folders = member_folders([member_name(prefix, info.name) for info in files],
+                                             [member_name(prefix, info.name)
+                                              for info in archive.getmembers() if info.isdir()])
+                    yield [
+                        ArchiveMember(member_name(prefix, info.name),
+                                      partial(self.read_tar_member, archive, info, budget, lock), depth + 1, budget,
+                                      folders)
+                        for info in files
+                    ]
+
+    def walk(self, name, source, depth=0, prefix=None, budget=None):
+        with self.open(name, source, depth, prefix, budget) as members:
+            for member in members:
+                data = member.reader()
+                if self.can_expand(member.depth) and self.kind(member.name, data):
+                    yield from self.walk(member.name, data, member.depth, budget=member.budget)
+                else:
+                    yield member.name, data
+
+    def check_size(self, name, size):
+        if size > self.max_member_size:
+            raise ArchiveError(f"Файл в архіві перевищує допустимий розмір: {name}")
+
+    def read_stream(self, name, stream, budget, compressed_size=None):
+        data = bytearray()
+        for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            data += block
+            budget.consume(name, len(block))
+            self.check_size(name, len(data))
+            if compressed_size is not None and len(data) > RATIO_THRESHOLD \
+                    and len(data) > max(compressed_size, 1) * self.max_ratio:
+                raise ArchiveError(f"Підозріло високий ступінь стиснення: {name}")
+        return bytes(data)
+
+    def read_zip_member(self, archive, info, budget):
+        self.check_size(info.filename, info.file_size)
+        with archive.open(info) as stream:
+            return self.read_stream(info.filename, stream, budget, info.compress_size)
+
+    def read_tar_member(self, archive, info, budget, lock):
+        self.check_size(info.name, info.size)
+        with lock:
+            return self.read_stream(info.name, archive.extractfile(info), budget)
+
+    def decompress(self, kind, name, source, budget):
+        compressed_size = len(source) if isinstance(source, (bytes, bytearray)) else os.path.getsize(source)
+        with open_binary(source) as raw, DECOMPRESSORS[kind](raw) as stream:
+            return self.read_stream(name, stream, budget, compressed_size)
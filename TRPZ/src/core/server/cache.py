@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+import codecs
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from functools import lru_cache
+
+DEFAULT_CACHE_SIZE = 512 * 1024 * 1024
+READ_SIZE = 1024 * 1024
+INDEX_NAME = "index.db"
+CACHE_INSTANCES = 16
+
+
+@lru_cache(maxsize=CACHE_INSTANCES)
+def cached_text_cache(directory, version, max_size):
+    return TextCache(directory, version, max_size)
+
+
+class TextCache:
+    def __init__(self, directory, version, max_size=DEFAULT_CACHE_SIZE):
+        self.directory = directory
+        self.version = version
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.conn = None
+        self.pid = None
+
+    def __reduce__(self):
+        return cached_text_cache, (self.directory, self.version, self.max_size)
+
+    def connect(self):
+        if self.conn is not None and self.pid == os.getpid():
+            return self.conn
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, INDEX_NAME), check_same_thread=False,
+                               isolation_level=None)
+        conn.execute('PRAGMA busy_timeout = 30000')
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+        except sqlite3.OperationalError:
+            pass
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    used REAL NOT NULL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_used ON entries (used)')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS totals (
+                    id INTEGER PRIMARY KEY CHECK (id = 0),
+                    size INTEGER NOT NULL
+                )
+            ''')
+            if conn.execute('SELECT size FROM totals WHERE id = 0').fetchone() is None:
+                entries = [(os.path.basename(path)[:-len(".z")], size, used) for path, size, used in self.entries()]
+                conn.executemany('INSERT OR REPLACE INTO entries (key, size, used) VALUES (?, ?, ?)', entries)
+                conn.execute('INSERT INTO totals (id, size) VALUES (0, ?)', (sum(size for _, size, _ in entries),))
+            conn.execute('COMMIT')
+        except BaseException:
+            conn.execute('ROLLBACK')
+            conn.close()
+            raise
+        self.conn = conn
+        self.pid = os.getpid()
+        return conn
+
+    def key(self, extension, source):
+        digest = hashlib.sha256()
+        if isinstance(source, (bytes, bytearray)):
+            digest.update(source)
+        else:
+            with open(source, "rb") as file:
+                for block in iter(lambda: file.read(READ_SIZE), b""):
+                    digest.update(block)
+        return hashlib.sha256(f"{digest.hexdigest()}:{extension}:{self.version}".encode("utf-8")).hexdigest()
+
+    def entry_path(self, key):
+        return os.path.join(self.directory, key[:2], key + ".z")
+
+    def read(self, key):
+        path = self.entry_path(key)
+        try:
+            entry = open(path, "rb")
+        except FileNotFoundError:
+            return None
+        with self.lock:
+            self.connect().execute('UPDATE entries SET used = ? WHERE key = ?', (time.time(), key))
+        return self.iter_entry(entry)
+
+    def iter_entry(self, entry):
+        decompressor = zlib.decompressobj()
+        decoder = codecs.getincrementaldecoder("utf-8")()
+        with entry:
+            for block in iter(lambda: entry.read(READ_SIZE), b""):
+                text = decoder.decode(decompressor.decompress(block))
+                if text:
+                    yield text
+            text = decoder.decode(decompressor.flush(), final=True)
+            if text:
+                yield text
+
+    def get(self, key):
+        chunks = self.read(key)
+        return None if chunks is None else "".join(chunks)
+
+    def writer(self, key):
+        return CacheWriter(self, key)
+
+    def added(self, key, size):
+        with self.lock:
+            conn = self.connect()
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+                conn.execute('INSERT OR REPLACE INTO entries (key, size, used) VALUES (?, ?, ?)',
+                             (key, size, time.time()))
+                conn.execute('UPDATE totals SET size = size + ? WHERE id = 0', (size - (row[0] if row else 0),))
+                total = conn.execute('SELECT size FROM totals WHERE id = 0').fetchone()[0]
+                if total > self.max_size:
+                    self.evict(conn, total)
+                conn.execute('COMMIT')
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+
+    def entries(self):
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith(".z"):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def evict(self, conn, total):
+        target = self.max_size * 0.9
+        removed = []
+        for key, size in conn.execute('SELECT key, size FROM entries ORDER BY used').fetchall():
+            if total <= target:
+                break
+            try:
+                os.remove(self.entry_path(key))
+            except FileNotFoundError:
+                pass
+            removed.append((key,))
+            total -= size
+        conn.executemany('DELETE FROM entries WHERE key = ?', removed)
+        conn.execute('UPDATE totals SET size = ? WHERE id = 0', (total,))
+
+
+class CacheWriter:
+    def __init__(self, cache, key):
+        self.cache = cache
+        self.key = key
+        self.path = cache.entry_path(key)
+        self.temp_path = f"{self.path}.{os.getpid()}.{id(self)}.tmp"
+        self.compressor = zlib.compressobj()
+        self.file = None
+        self.size = 0
+
+    def write(self, text):
+        if self.file is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.file = open(self.temp_path, "wb")
+        data = self.compressor.compress(text.encode("utf-8"))
+        self.size += len(data)
+        self.file.write(data)
+
+    def commit(self):
+        if self.file is None:
+            self.write("")
+        data = self.compressor.flush()
+        self.size += len(data)
+        self.file.write(data)
+        self.file.close()
+        self.file = None
+        os.replace(self.temp_path, self.path)
+        self.cache.added(self.key, self.size)
+
+    def discard(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            os.remove(self.temp_path)
@@ -1,294 +1,661 @@
-# -*- coding: utf-8 -*-
-import argparse
-import io
-import mimetypes
-import os
-import email
-import re
-import pyfiglet
-import asyncio
-import aiofiles
-from email.header import decode_header
-import docx
-import pandas as pd
-import xml.etree.ElementTree as ET
-import time
-import fitz
-import subprocess
-from pandas.io.sas.sas_constants import magic
-
-
-class EmailProcessor:
-    def __init__(self, file_path, log_file, error_file, keywords, output_folder):
-        self.file_path = file_path
-        self.log_file = log_file
-        self.error_file = error_file
-        self.keywords = keywords
-        self.output_folder = output_folder
-
-    def sanitize_filename(self, filename):
-        valid_filename = re.sub(r'[\/:*?"<>|]', '_', filename)
-        return valid_filename
-
-    def decode_subject(self, subject):
-        decoded = decode_header(subject)
-        return decoded[0][0].decode(decoded[0][1]) if decoded[0][1] else decoded[0][0]
-
-    def get_file_extension(self, filename, content):
-        _, extension = os.path.splitext(filename)
-        if extension:
-            return extension.lstrip('.').lower()
-
-        mime_type, _ = mimetypes.guess_type(filename)
-        if mime_type:
-            extension = mimetypes.guess_extension(mime_type)
-            if extension:
-                return extension.lstrip('.').lower()
-
-        try:
-            if content:
-                mime_type = magic.Magic(mime=True).from_buffer(content)
-                extension = mimetypes.guess_extension(mime_type)
-                return extension.lstrip('.').lower() if extension else None
-        except Exception:
-            return None
-
-    def decode_content(self, part):
-        content_type = part.get_content_type()
-        if "text/plain" in content_type:
-            try:
-                charset = part.get_content_charset()
-                content = part.get_payload(decode=True)
-                if charset:
-                    content = content.decode(charset)
-                return content
-            except TypeError:
-                return "Failed to decode content"
-        elif "text/html" in content_type:
-            return "HTML content:\n" + part.get_payload()
-        else:
-            return "Non-text content. Content type: " + content_type
-
-    async def process_part(self, part, folder_path):
-        try:
-            content = self.decode_content(part)
-            found_keywords = []
-            for keyword in self.keywords:
-                if keyword.lower() in content.lower():
-                    found_keywords.append(keyword)
-            if found_keywords:
-                filename = self.file_path
-                for keyword in found_keywords:
-                    await self.log_found_keyword(filename, keyword)
-        except Exception as e:
-            await self.log_error(f"Помилка з файлом: {self.file_path}\nПомилка: {str(e)}")
-
-    async def save_attachments(self, part, folder_path):
-        try:
-            if part.get_content_maintype() == "multipart":
-                return
-            filename = part.get_filename()
-            if not filename:
-                return
-
-            decoded_filename, charset = decode_header(filename)[0]
-            if charset:
-                decoded_filename = decoded_filename.decode(charset)
-
-            extension = self.get_file_extension(decoded_filename, part.get_payload(decode=True))
-            if extension:
-                sanitized_filename = self.sanitize_filename(decoded_filename)
-                attachments_dir = os.path.join(folder_path, "attachments", extension)
-                os.makedirs(attachments_dir, exist_ok=True)
-
-                payload = part.get_payload(decode=True)
-
-                content = None
-                if extension == "txt":
-                    content = payload.decode("utf-8")
-                elif extension == "docx":
-                    doc = docx.Document(io.BytesIO(payload))
-                    content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-                elif extension == "pdf":
-                    pdf_document = fitz.open(stream=io.BytesIO(payload))
-                    content = ""
-                    for page_num in range(len(pdf_document)):
-                        page = pdf_document.load_page(page_num)
-                        content += page.get_text()
-                # elif extension == "xlsx":
-                #     df = pd.read_excel(io.BytesIO(payload))
-                #     content = df.to_string(index=False)
-                elif extension == "xml":
-                    tree = ET.ElementTree(ET.fromstring(payload))
-                    root = tree.getroot()
-                    content = ET.tostring(root, encoding="utf-8").decode("utf-8")
-                elif extension == "csv":
-                    df = pd.read_csv(io.BytesIO(payload))
-                    content = df.to_string(index=False)
-
-                elif extension in ["js", "css", "html", "json", "tsv"]:
-                    content = payload.decode("utf-8")
-
-                if content:
-                    found_keywords = []
-                    for keyword in self.keywords:
-                        if keyword.lower() in content.lower():
-                            found_keywords.append(keyword)
-
-                    if found_keywords:
-                        filepath = os.path.join(attachments_dir, sanitized_filename)
-                        async with aiofiles.open(filepath, "wb") as attachment_file:
-                            await attachment_file.write(payload)
-
-                        for keyword in found_keywords:
-                            await self.log_found_keyword(filepath, keyword)
-
-        except Exception as e:
-            await self.log_error(f"Помилка при збереженні вкладення: {str(e)}\n")
-    async def log_found_keyword(self, filename, keyword):
-        log_file_path = self.log_file
-        drive, path = os.path.splitdrive(filename)
-        dirs, filename = os.path.split(path)
-        _, dirs = os.path.split(dirs)
-        new_filename = os.path.join(os.path.sep, dirs, filename)
-
-        async with aiofiles.open(log_file_path, "a", encoding="utf-8") as log:
-            await log.write(f"Файл: {new_filename}, Ключевое слово: {keyword}\n")
-
-    async def log_error(self, error_message):
-        error_file_path = self.error_file
-        async with aiofiles.open(error_file_path, "a", encoding="utf-8") as err_log:
-            await err_log.write(error_message)
-
-    async def process_email(self, folder_path, save_attachments=False):
-        try:
-            async with aiofiles.open(self.file_path, "rb") as file:
-                data = await file.read()
-                msg = email.message_from_bytes(data)
-
-            tasks = []
-            for part in msg.walk():
-                if part.get_content_maintype() == "multipart":
-                    continue
-                task = self.process_part(part, folder_path)
-                tasks.append(task)
-
-                if save_attachments:
-                    attachment_task = self.save_attachments(part, folder_path)
-                    tasks.append(attachment_task)
-
-            await asyncio.gather(*tasks)
-
-        except Exception as e:
-            await self.log_error(f"Помилка обробки електронної пошти в файлі: {self.file_path}\n")
-            await self.log_error(f"Помилка: {str(e)}\n")
-
-    async def process_file(self, file_path):
-        try:
-            extension = self.get_file_extension(file_path, None)
-            content = None
-
-            if extension == "txt":
-                async with aiofiles.open(file_path, "r", encoding="utf-8") as text_file:
-                    content = await text_file.read()
-            elif extension == "docx":
-                doc = docx.Document(file_path)
-                content = "\n".join([paragraph.text for paragraph in doc.paragraphs])
-            elif extension == "pdf":
-                pdf_document = fitz.open(file_path)
-                num_pages = pdf_document.page_count
-                content = ""
-
-                for page_num in range(num_pages):
-                    page = pdf_document.load_page(page_num)
-                    content += page.get_text()
-
-            elif extension == "csv":
-                df = pd.read_csv(file_path)
-                content = df.to_string(index=False)
-            elif extension == "xlsx":
-                df = pd.read_excel(file_path)
-                content = df.to_string(index=False)
-
-            elif extension == "xml":
-                tree = ET.parse(file_path)
-                root = tree.getroot()
-                content = ET.tostring(root, encoding="utf-8").decode("utf-8")
-
-            if content:
-                found_keywords = []
-                for keyword in self.keywords:
-                    if keyword.lower() in content.lower():
-                        found_keywords.append(keyword)
-
-                if found_keywords:
-                    for keyword in found_keywords:
-                        await self.log_found_keyword(file_path, keyword)
-
-        except Exception as e:
-            await self.log_error(f"Помилка з файлом: {file_path}\nПомилка: {str(e)}")
-
-
-async def search_keywords_in_emails(folder_path, log_file, error_file, keywords, output_folder, save_attachments=False):
-    try:
-        processed_files = set()
-        os.makedirs(output_folder, exist_ok=True)
-        tasks = []
-        for root, dirs, files in os.walk(folder_path):
-            for file_name in files:
-                file_path = os.path.join(root, file_name)
-                if file_path not in processed_files:
-                    if file_name.endswith(".eml"):
-                        email_processor = EmailProcessor(file_path, log_file, error_file, keywords, output_folder)
-                        task = asyncio.create_task(email_processor.process_email(output_folder, save_attachments))
-                        tasks.append(task)
-                    else:
-                        email_processor = EmailProcessor(file_path, log_file, error_file, keywords, output_folder)
-                        task = asyncio.create_task(email_processor.process_file(file_path))
-                        tasks.append(task)
-                    processed_files.add(file_path)
-
-            await asyncio.gather(*tasks)
-
-        print(f"Оброблено файлів: {len(processed_files)} в папці: {folder_path}")
-    except Exception as e:
-        print(f"Помилка в search_keywords_in_emails: {str(e)}")
-
-
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser(description="пошук приколів")
-    parser.add_argument("-f", "--folder", type=str, help="Шлях до листів")
-    parser.add_argument("-l", "--log", type=str, help="Шлях для збереження лог-файлу")
-    parser.add_argument("-e", "--error", type=str, help="Шлях для збереження лог-файлу з помилками")
-    parser.add_argument("-k", "--keywords-file", type=str, help="Шлях до словника")
-    parser.add_argument("-o", "--output-folder", type=str, help="Шлях до теки для збереження вкладень")
-    parser.add_argument("-a", "--attachments", action='store_true',
-                        help="Завантажити вкладення (за замовчуванням: False)")
-    parser.add_argument("-d", "--extract", action='store_true', help="Запустити extract.py")
-
-    args = parser.parse_args()
-    folder_path = args.folder if args.folder else r"./"
-    log_file = args.log if args.log else "log.txt"
-    error_file = args.error if args.error else "errors.txt"
-    output_folder = args.output_folder if args.output_folder else "attachments"
-    save_attachments = args.attachments
-
-    if args.extract and args.folder:
-        extract_command = f"python extract.py {args.folder}"
-        subprocess.Popen(extract_command, shell=True).wait()
-
-    if args.keywords_file:
-        with open(args.keywords_file, "r", encoding="utf-8") as keywords_file:
-            keywords = [keyword.strip() for keyword in keywords_file.read().split(",")]
-
-    start_time = time.time()
-    os.makedirs(output_folder, exist_ok=True)
-    text_to_display = "Email Parser"
-    ascii_art = pyfiglet.figlet_format(text_to_display)
-    print(ascii_art)
-
-    asyncio.run(search_keywords_in_emails(folder_path, log_file, error_file, keywords, output_folder, save_attachments))
-
-    end_time = time.time()
-    elapsed_time = end_time - start_time
-    print(f"Час роботи скрипта: {elapsed_time} секунд.")
+# -*- coding: utf-8 -*-
+import argparse
+import json
+import mimetypes
+import os
+import re
+import asyncio
+import aiofiles
+import itertools
+from email.header import decode_header
+from email.feedparser import BytesFeedParser
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import ExitStack
+from matcher import KeywordMatcher, install_matcher
+from archives import ArchiveMember, ArchiveWalker, DEFAULT_MAX_DEPTH
+from extractors import (EXTRACTOR_VERSION, DEFAULT_ENGINE, ENGINES, FILE_EXTENSIONS, ATTACHMENT_EXTENSIONS, CHUNK_SIZE,
+                        scan_source, extract_source)
+from cache import TextCache, DEFAULT_CACHE_SIZE
+from mailboxes import Mbox, is_mbox, is_maildir_message
+from index import TextIndex, hit_path
+from sink import Hit, ScanError, ResultSink, TextLogFormat, JsonLinesFormat
+from metrics import metrics
+
+
+class EmailProcessor:
+    def __init__(self, file_path, log_file, error_file, keywords, output_folder, matcher=None, executor=None,
+                 sink=None, cache=None, engine=DEFAULT_ENGINE, exhaustive=False):
+        self.file_path = file_path
+        self.log_file = log_file
+        self.error_file = error_file
+        self.keywords = keywords
+        self.output_folder = output_folder
+        self.matcher = matcher if matcher is not None else KeywordMatcher(keywords)
+        self.executor = executor
+        self.sink = sink
+        self.cache = cache
+        self.engine = engine
+        self.exhaustive = exhaustive
+
+    async def scan(self, extension, source):
+        started = time.perf_counter()
+        if self.executor is None:
+            found_keywords = scan_source(extension, source, self.matcher, self.cache, self.engine, self.exhaustive)
+        else:
+            loop = asyncio.get_running_loop()
+            found_keywords = await loop.run_in_executor(self.executor, scan_source, extension, source, self.matcher,
+                                                        self.cache, self.engine, self.exhaustive)
+        if metrics.enabled:
+            metrics.observe("email_parser_extract_seconds", time.perf_counter() - started, extension=extension)
+            metrics.inc("email_parser_bytes_total", source_size(source), extension=extension)
+        return found_keywords
+
+    def match(self, content):
+        if not content:
+            return []
+        scanner = self.matcher.scanner(self.exhaustive)
+        scanner.feed(content)
+        return scanner.results()
+
+    async def extract(self, extension, source):
+        if self.executor is None:
+            return extract_source(extension, source, self.cache, self.engine)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, extract_source, extension, source, self.cache, self.engine)
+
+    def sanitize_filename(self, filename):
+        valid_filename = re.sub(r'[\/:*?"<>|]', '_', filename)
+        return valid_filename
+
+    def decode_filename(self, filename):
+        decoded_filename, charset = decode_header(filename)[0]
+        if charset:
+            decoded_filename = decoded_filename.decode(charset)
+        return decoded_filename
+
+    def decode_subject(self, subject):
+        decoded = decode_header(subject)
+        return decoded[0][0].decode(decoded[0][1]) if decoded[0][1] else decoded[0][0]
+
+    def get_file_extension(self, filename, content):
+        _, extension = os.path.splitext(filename)
+        if extension:
+            return extension.lstrip('.').lower()
+
+        mime_type, _ = mimetypes.guess_type(filename)
+        if mime_type:
+            extension = mimetypes.guess_extension(mime_type)
+            if extension:
+                return extension.lstrip('.').lower()
+
+        try:
+            if content:
+                import magic
+                mime_type = magic.Magic(mime=True).from_buffer(content)
+                extension = mimetypes.guess_extension(mime_type)
+                return extension.lstrip('.').lower() if extension else None
+        except Exception:
+            return None
+
+    def decode_content(self, part, payload):
+        if payload is None or part.get_content_maintype() != "text":
+            return None
+        charset = part.get_content_charset() or "utf-8"
+        try:
+            return payload.decode(charset, errors="replace")
+        except LookupError:
+            return payload.decode("utf-8", errors="replace")
+
+    def classify_part(self, part):
+        payload = part.get_payload(decode=True)
+        filename = part.get_filename()
+        if not filename:
+            return None, None, payload
+        decoded_filename = self.decode_filename(filename)
+        return decoded_filename, self.get_file_extension(decoded_filename, payload), payload
+
+    async def process_part(self, part, folder_path, save_attachments=False):
+        try:
+            decoded_filename, extension, payload = self.classify_part(part)
+            if decoded_filename is None:
+                found_keywords = self.match(self.decode_content(part, payload))
+                for keyword, count, offset in found_keywords:
+                    await self.log_found_keyword(self.file_path, keyword, count, "body", offset)
+                return
+
+            if not payload:
+                return
+            if extension in ATTACHMENT_EXTENSIONS:
+                metrics.inc("email_parser_files_total", type="attachment")
+                found_keywords = await self.scan(extension, payload)
+            else:
+                content = self.decode_content(part, payload)
+                if content is None:
+                    return
+                metrics.inc("email_parser_files_total", type="attachment")
+                found_keywords = self.match(content)
+            if not found_keywords:
+                return
+
+            if save_attachments:
+                filepath = await self.save_attachment(folder_path, extension or "txt", decoded_filename, payload)
+            else:
+                filepath = hit_path(self.file_path, decoded_filename)
+            for keyword, count, offset in found_keywords:
+                await self.log_found_keyword(filepath, keyword, count, decoded_filename, offset)
+        except Exception as e:
+            await self.log_error(f"Помилка з файлом: {self.file_path}\nПомилка: {str(e)}", e)
+
+    async def save_attachment(self, folder_path, extension, decoded_filename, payload):
+        attachments_dir = os.path.join(folder_path, "attachments", extension)
+        os.makedirs(attachments_dir, exist_ok=True)
+        filepath = os.path.join(attachments_dir, self.sanitize_filename(decoded_filename))
+        async with aiofiles.open(filepath, "wb") as attachment_file:
+            await attachment_file.write(payload)
+        return filepath
+
+    async def emit(self, record):
+        if self.sink is not None:
+            await self.sink.add(record)
+        else:
+            with TextLogFormat(self.log_file, self.error_file) as result_format:
+                result_format.write([record])
+
+    async def log_found_keyword(self, filename, keyword, count=None, part=None, offset=None):
+        metrics.inc("email_parser_hits_total", keyword=keyword)
+        await self.emit(Hit(filename, keyword, count, part, offset))
+
+    async def log_error(self, error_message, error=None):
+        if error is not None:
+            metrics.inc("email_parser_errors_total", type=type(error).__name__)
+        await self.emit(ScanError(error_message, self.file_path))
+
+    async def read_message(self, data=None):
+        started = time.perf_counter()
+        parser = BytesFeedParser()
+        if data is None:
+            async with aiofiles.open(self.file_path, "rb") as file:
+                while True:
+                    chunk = await file.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    parser.feed(chunk)
+        else:
+            view = memoryview(data)
+            for start in range(0, len(view), CHUNK_SIZE):
+                parser.feed(bytes(view[start:start + CHUNK_SIZE]))
+        message = parser.close()
+        metrics.observe("email_parser_stage_seconds", time.perf_counter() - started, stage="parse")
+        return message
+
+    async def process_email(self, folder_path, save_attachments=False, data=None):
+        try:
+            metrics.inc("email_parser_files_total", type="email")
+            msg = await self.read_message(data)
+
+            await asyncio.gather(*(
+                self.process_part(part, folder_path, save_attachments)
+                for part in msg.walk()
+                if part.get_content_maintype() != "multipart"
+            ))
+
+        except Exception as e:
+            await self.log_error(f"Помилка обробки електронної пошти в файлі: {self.file_path}\n", e)
+            await self.log_error(f"Помилка: {str(e)}\n")
+
+    async def collect_documents(self, name=None, data=None, depth=0, budget=None, folders=None, walker=None,
+                                mbox_index=None):
+        name = self.file_path if name is None else name
+        source = name if data is None else data
+        if not is_email(name, folders):
+            extension = self.get_file_extension(name, None)
+            if extension in FILE_EXTENSIONS:
+                return [("file", await self.extract(extension, source))]
+            if walker is not None and walker.can_expand(depth) and await asyncio.to_thread(walker.kind, name, source):
+                with walker.open(name, source, depth, prefix="", budget=budget) as members:
+                    return await self.collect_members(members, "", walker, mbox_index)
+            if await asyncio.to_thread(is_mbox, name, source):
+                with Mbox(name, data, mbox_index) as mailbox:
+                    offsets = await asyncio.to_thread(mailbox.offsets)
+                    return await self.collect_members(mailbox.members(offsets, depth), name + "/", walker, mbox_index)
+            return []
+
+        msg = await self.read_message(data)
+
+        documents = []
+        for part in msg.walk():
+            if part.get_content_maintype() == "multipart":
+                continue
+            decoded_filename, extension, payload = self.classify_part(part)
+            if decoded_filename is None:
+                content = self.decode_content(part, payload)
+                if content:
+                    documents.append(("body", content))
+                continue
+
+            if not payload:
+                continue
+            if extension in ATTACHMENT_EXTENSIONS:
+                documents.append((decoded_filename, await self.extract(extension, payload)))
+            else:
+                content = self.decode_content(part, payload)
+                if content:
+                    documents.append((decoded_filename, content))
+        return documents
+
+    async def collect_members(self, members, prefix, walker=None, mbox_index=None):
+        documents = []
+        for member in members:
+            name = member.name[len(prefix):]
+            try:
+                data = await member.read()
+                for part, content in await self.collect_documents(member.name, data, member.depth, member.budget,
+                                                                  member.folders, walker, mbox_index):
+                    documents.append((name if part in ("body", "file") else hit_path(name, part), content))
+            except Exception as e:
+                await self.log_error(f"Помилка індексації файлу: {member.name}\nПомилка: {str(e)}\n", e)
+        return documents
+
+    async def index_file(self, index, walker=None, mbox_index=None):
+        try:
+            path = os.path.abspath(self.file_path)
+            stat = os.stat(path)
+            if index.is_current(path, stat):
+                return
+            index.replace(path, stat, await self.collect_documents(walker=walker, mbox_index=mbox_index))
+        except Exception as e:
+            await self.log_error(f"Помилка індексації файлу: {self.file_path}\nПомилка: {str(e)}\n", e)
+
+    async def process_file(self, file_path, data=None):
+        try:
+            extension = self.get_file_extension(file_path, None)
+            found_keywords = []
+            if extension in FILE_EXTENSIONS:
+                metrics.inc("email_parser_files_total", type="document")
+                found_keywords = await self.scan(extension, file_path if data is None else data)
+            else:
+                metrics.inc("email_parser_files_total", type="skipped")
+
+            if found_keywords:
+                for keyword, count, offset in found_keywords:
+                    await self.log_found_keyword(file_path, keyword, count, "file", offset)
+
+        except Exception as e:
+            await self.log_error(f"Помилка з файлом: {file_path}\nПомилка: {str(e)}", e)
+
+
+DEFAULT_CONCURRENCY = 16
+
+
+def source_size(source):
+    if isinstance(source, (bytes, bytearray)):
+        return len(source)
+    try:
+        return os.path.getsize(source)
+    except OSError:
+        return 0
+
+
+def is_email(file_path, folders=None):
+    return file_path.endswith(".eml") or is_maildir_message(file_path, folders)
+
+
+def iter_files(folder_path):
+    if os.path.isfile(folder_path):
+        yield folder_path
+        return
+    for root, dirs, files in os.walk(folder_path):
+        for file_name in files:
+            yield os.path.join(root, file_name)
+
+
+class ItemGroup:
+    def __init__(self, size, close=None):
+        self.remaining = size
+        self.close = close
+
+    def done(self):
+        self.remaining -= 1
+        if self.remaining <= 0 and self.close is not None:
+            self.close()
+
+
+class Pipeline:
+    def __init__(self, handler, concurrency=DEFAULT_CONCURRENCY, progress=None):
+        self.handler = handler
+        self.workers = max(1, concurrency)
+        self.progress = progress
+        self.queue = asyncio.PriorityQueue()
+        self.slots = asyncio.Semaphore(self.workers * 2)
+        self.order = itertools.count()
+        self.pending = 0
+        self.feeding = True
+        self.processed = 0
+
+    def put(self, priority, item, group=None):
+        self.queue.put_nowait((priority, next(self.order), item, group))
+        metrics.inc("email_parser_queue_depth")
+        if item is not None:
+            self.pending += 1
+
+    def submit(self, members, close=None):
+        members = list(members)
+        group = ItemGroup(len(members), close)
+        if not members:
+            group.done()
+        for member in members:
+            self.put(-1 - member.depth, member, group)
+
+    def finish(self):
+        if not self.feeding and self.pending == 0:
+            for _ in range(self.workers):
+                self.put(1, None)
+
+    async def feed(self, items):
+        try:
+            for item in items:
+                await self.slots.acquire()
+                self.put(0, item)
+        finally:
+            self.feeding = False
+            self.finish()
+
+    async def work(self):
+        while True:
+            _, _, item, group = await self.queue.get()
+            metrics.inc("email_parser_queue_depth", -1)
+            if item is None:
+                return
+            if group is None:
+                self.slots.release()
+            metrics.inc("email_parser_active_workers")
+            try:
+                await self.handler(item)
+                if group is None:
+                    self.processed += 1
+                    if self.progress is not None:
+                        self.progress()
+            finally:
+                metrics.inc("email_parser_active_workers", -1)
+                self.pending -= 1
+                if group is not None:
+                    group.done()
+                self.finish()
+
+    async def run(self, items):
+        workers = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+        try:
+            await self.feed(items)
+            await asyncio.gather(*workers)
+            return self.processed
+        finally:
+            for worker in workers:
+                worker.cancel()
+
+
+async def run_pipeline(items, handler, concurrency=DEFAULT_CONCURRENCY, progress=None):
+    return await Pipeline(handler, concurrency, progress).run(items)
+
+
+async def scan_sources(items, log_file, error_file, keywords, output_folder, save_attachments=False, executor=None,
+                       concurrency=DEFAULT_CONCURRENCY, sink=None, cache=None, progress=None, engine=DEFAULT_ENGINE,
+                       exhaustive=False, walker=None, mbox_index=None):
+    os.makedirs(output_folder, exist_ok=True)
+    matcher = KeywordMatcher(keywords)
+    own_sink = sink is None
+    if own_sink:
+        sink = ResultSink([TextLogFormat(log_file, error_file)])
+    sink.start()
+
+    async def report_error(message, file_path, error):
+        metrics.inc("email_parser_errors_total", type=type(error).__name__)
+        await sink.add(ScanError(message, file_path))
+
+    async def expand_archive(file_path, source, depth, budget):
+        stack = ExitStack()
+        try:
+            members = stack.enter_context(walker.open(file_path, source, depth, budget=budget))
+        except Exception as e:
+            await report_error(f"Помилка розпакування архіву: {file_path}\nПомилка: {str(e)}\n", file_path, e)
+            return
+        pipeline.submit(members, stack.close)
+
+    async def expand_mbox(file_path, data, depth):
+        stack = ExitStack()
+        try:
+            mailbox = stack.enter_context(Mbox(file_path, data, mbox_index))
+            offsets = await asyncio.to_thread(mailbox.offsets)
+        except Exception as e:
+            stack.close()
+            await report_error(f"Помилка читання поштової скриньки: {file_path}\nПомилка: {str(e)}\n", file_path, e)
+            return
+        pipeline.submit(mailbox.members(offsets, depth), stack.close)
+
+    async def scan_item(item):
+        if isinstance(item, ArchiveMember):
+            file_path = item.name
+            started = time.perf_counter()
+            try:
+                data = await item.read()
+            except Exception as e:
+                await report_error(f"Помилка читання файлу з архіву: {file_path}\nПомилка: {str(e)}\n", file_path, e)
+                return
+            metrics.observe("email_parser_stage_seconds", time.perf_counter() - started, stage="read")
+            depth, budget, folders, email = item.depth, item.budget, item.folders, item.email
+        else:
+            file_path = item
+            data = None
+            depth, budget, folders, email = 0, None, None, None
+
+        source = file_path if data is None else data
+        message = is_email(file_path, folders) if email is None else email
+        if not message and os.path.splitext(file_path)[1].lstrip(".").lower() not in FILE_EXTENSIONS:
+            if walker is not None and walker.can_expand(depth):
+                try:
+                    kind = await asyncio.to_thread(walker.kind, file_path, source)
+                except OSError:
+                    kind = None
+                if kind is not None:
+                    await expand_archive(file_path, source, depth, budget)
+                    return
+            try:
+                mbox = await asyncio.to_thread(is_mbox, file_path, source)
+            except OSError:
+                mbox = False
+            if mbox:
+                await expand_mbox(file_path, data, depth)
+                return
+
+        email_processor = EmailProcessor(file_path, log_file, error_file, keywords, output_folder, matcher,
+                                         executor, sink, cache, engine, exhaustive)
+        if message:
+            await email_processor.process_email(output_folder, save_attachments, data)
+        else:
+            await email_processor.process_file(file_path, data)
+
+    pipeline = Pipeline(scan_item, concurrency, progress)
+    try:
+        return await pipeline.run(items)
+    finally:
+        if own_sink:
+            await sink.close()
+
+
+async def search_keywords_in_emails(folder_path, log_file, error_file, keywords, output_folder, save_attachments=False,
+                                    executor=None, concurrency=DEFAULT_CONCURRENCY, sink=None, cache=None,
+                                    engine=DEFAULT_ENGINE, exhaustive=False, walker=None, mbox_index=None):
+    try:
+        processed = await scan_sources(iter_files(folder_path), log_file, error_file, keywords, output_folder,
+                                       save_attachments, executor, concurrency, sink, cache, engine=engine,
+                                       exhaustive=exhaustive, walker=walker, mbox_index=mbox_index)
+        print(f"Оброблено файлів: {processed} в папці: {folder_path}")
+    except Exception as e:
+        print(f"Помилка в search_keywords_in_emails: {str(e)}")
+
+
+async def search_keywords_in_archive(archive_path, log_file, error_file, keywords, output_folder,
+                                     save_attachments=False, executor=None, concurrency=DEFAULT_CONCURRENCY, sink=None,
+                                     cache=None, engine=DEFAULT_ENGINE, exhaustive=False, walker=None,
+                                     mbox_index=None):
+    walker = walker if walker is not None else ArchiveWalker()
+    try:
+        with walker.open(archive_path, archive_path, prefix="") as members:
+            processed = await scan_sources(members, log_file, error_file, keywords, output_folder,
+                                           save_attachments, executor, concurrency, sink, cache, engine=engine,
+                                           exhaustive=exhaustive, walker=walker, mbox_index=mbox_index)
+        print(f"Оброблено файлів: {processed} в архіві: {archive_path}")
+    except Exception as e:
+        print(f"Помилка в search_keywords_in_archive: {str(e)}")
+
+
+async def index_emails(folder_path, index, error_file, executor=None, concurrency=DEFAULT_CONCURRENCY, cache=None,
+                       engine=DEFAULT_ENGINE, walker=None, mbox_index=None, sink=None):
+    own_sink = sink is None
+    if own_sink:
+        sink = ResultSink([TextLogFormat(None, error_file)])
+    sink.start()
+    try:
+        matcher = KeywordMatcher([])
+        seen_paths = set()
+
+        async def index_path(file_path):
+            seen_paths.add(os.path.abspath(file_path))
+            email_processor = EmailProcessor(file_path, None, error_file, [], None, matcher, executor, sink, cache,
+                                             engine)
+            await email_processor.index_file(index, walker, mbox_index)
+
+        processed = await run_pipeline(iter_files(folder_path), index_path, concurrency)
+        removed = index.prune(folder_path, seen_paths)
+        index.commit()
+        print(f"Проіндексовано файлів: {processed}, видалено з індексу: {removed}")
+    except Exception as e:
+        print(f"Помилка в index_emails: {str(e)}")
+    finally:
+        if own_sink:
+            await sink.close()
+
+
+async def query_index(index, log_file, error_file, keywords, sink=None):
+    own_sink = sink is None
+    if own_sink:
+        sink = ResultSink([TextLogFormat(log_file, error_file)])
+    sink.start()
+    try:
+        for path, part, keyword in await asyncio.to_thread(index.query, keywords):
+            await sink.add(Hit(hit_path(path, part), keyword, part=part))
+    finally:
+        if own_sink:
+            await sink.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="пошук приколів")
+    parser.add_argument("-f", "--folder", type=str,
+                        help="Шлях до листів (тека, Maildir, mbox або архів zip/tar/gz/bz2/xz)")
+    parser.add_argument("-l", "--log", type=str, help="Шлях для збереження лог-файлу")
+    parser.add_argument("-e", "--error", type=str, help="Шлях для збереження лог-файлу з помилками")
+    parser.add_argument("-k", "--keywords-file", type=str, help="Шлях до словника")
+    parser.add_argument("-o", "--output-folder", type=str, help="Шлях до теки для збереження вкладень")
+    parser.add_argument("-a", "--attachments", action='store_true',
+                        help="Завантажити вкладення (за замовчуванням: False)")
+    parser.add_argument("-d", "--extract", action='store_true',
+                        help="Сканувати вміст архівів у теці (zip/tar/gz/bz2/xz) без розпакування на диск")
+    parser.add_argument("--archive-depth", type=int, default=DEFAULT_MAX_DEPTH,
+                        help=f"Максимальна глибина вкладених архівів (за замовчуванням: {DEFAULT_MAX_DEPTH})")
+    parser.add_argument("-w", "--workers", type=int, default=0,
+                        help="Кількість процесів для розбору файлів (за замовчуванням: 0 - без пулу процесів)")
+    parser.add_argument("-j", "--jsonl", type=str,
+                        help="Шлях до файлу з результатами у форматі JSON Lines (додатково до лог-файлу)")
+    parser.add_argument("--cache", type=str, help="Тека для кешу видобутого тексту (за замовчуванням: без кешу)")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024),
+                        help="Максимальний розмір кешу в МБ")
+    parser.add_argument("--mbox-index", type=str,
+                        help="Тека для індексу листів у mbox (за замовчуванням: <cache>/mbox, якщо задано --cache)")
+    parser.add_argument("--index", type=str, help="Побудувати або оновити індекс (SQLite) для теки з листами")
+    parser.add_argument("--query", type=str, help="Шукати ключові слова в індексі замість повного сканування")
+    parser.add_argument("--engine", choices=ENGINES, default=DEFAULT_ENGINE,
+                        help="Розбір DOCX/XLSX: native - напряму з XML, legacy - python-docx/pandas")
+    parser.add_argument("--all-hits", action='store_true',
+                        help="Сканувати документи повністю та рахувати кількість входжень кожного ключового слова")
+    parser.add_argument("--metrics-json", type=str,
+                        help="Зібрати метрики сканування та зберегти їх у JSON-файл ('-' - вивести в консоль)")
+    parser.add_argument("--no-banner", action='store_true', help="Не виводити банер під час запуску")
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"Кількість файлів, що обробляються одночасно (за замовчуванням: {DEFAULT_CONCURRENCY})")
+
+    args = parser.parse_args()
+    folder_path = args.folder if args.folder else r"./"
+    log_file = args.log if args.log else "log.txt"
+    error_file = args.error if args.error else "errors.txt"
+    output_folder = args.output_folder if args.output_folder else "attachments"
+    save_attachments = args.attachments
+    keywords = []
+
+    if args.keywords_file:
+        with open(args.keywords_file, "r", encoding="utf-8") as keywords_file:
+            keywords = [keyword.strip() for keyword in keywords_file.read().split(",")]
+
+    start_time = time.time()
+    if args.metrics_json:
+        metrics.enable()
+    os.makedirs(output_folder, exist_ok=True)
+    if not args.no_banner:
+        import pyfiglet
+        text_to_display = "Email Parser"
+        ascii_art = pyfiglet.figlet_format(text_to_display)
+        print(ascii_art)
+
+    cache = TextCache(args.cache, EXTRACTOR_VERSION, args.cache_size * 1024 * 1024) if args.cache else None
+    walker = ArchiveWalker(args.archive_depth)
+    mbox_index = args.mbox_index or (os.path.join(args.cache, "mbox") if args.cache else None)
+    result_formats = [TextLogFormat(log_file, error_file)]
+    if args.jsonl:
+        result_formats.append(JsonLinesFormat(args.jsonl))
+
+    async def run_search():
+        if args.index:
+            index = TextIndex(args.index)
+            try:
+                await index_emails(folder_path, index, error_file, executor, args.concurrency, cache, args.engine,
+                                   walker if args.extract else None, mbox_index)
+            finally:
+                index.close()
+        if args.index and not args.query:
+            return
+        async with ResultSink(result_formats) as sink:
+            if args.query:
+                index = TextIndex(args.query)
+                try:
+                    await query_index(index, log_file, error_file, keywords, sink)
+                finally:
+                    index.close()
+            elif os.path.isfile(folder_path) and walker.kind(folder_path, folder_path):
+                await search_keywords_in_archive(folder_path, log_file, error_file, keywords, output_folder,
+                                                 save_attachments, executor, args.concurrency, sink, cache,
+                                                 args.engine, args.all_hits, walker, mbox_index)
+            else:
+                await search_keywords_in_emails(folder_path, log_file, error_file, keywords, output_folder,
+                                                save_attachments, executor, args.concurrency, sink, cache,
+                                                args.engine, args.all_hits, walker if args.extract else None,
+                                                mbox_index)
+
+    executor = ProcessPoolExecutor(max_workers=args.workers, initializer=install_matcher,
+                                   initargs=(keywords,)) if args.workers > 0 else None
+    try:
+        asyncio.run(run_search())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    end_time = time.time()
+    elapsed_time = end_time - start_time
+    print(f"Час роботи скрипта: {elapsed_time} секунд.")
+
+    if args.metrics_json:
+        summary = json.dumps(metrics.summary(), ensure_ascii=False, indent=2)
+        if args.metrics_json == "-":
+            print(summary)
+        else:
+            with open(args.metrics_json, "w", encoding="utf-8") as metrics_file:
+                metrics_file.write(summary)
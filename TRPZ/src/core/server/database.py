@@ -1,30 +1,356 @@
-import sqlite3
-from datetime import datetime
-class DatabaseManager:
-    def __init__(self, db_path):
-        self.db_path = db_path
-        self.init_db()
-
-    def init_db(self):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS requests (
-                id INTEGER PRIMARY KEY,
-                timestamp TEXT NOT NULL,
-                filename TEXT NOT NULL,
-                keywords TEXT NOT NULL
-            )
-        ''')
-        conn.commit()
-        conn.close()
-
-    async def log_request(self, filename, keywords):
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO requests (timestamp, filename, keywords) 
-            VALUES (?, ?, ?)
-        ''', (datetime.now().isoformat(), filename, ','.join(keywords)))
-        conn.commit()
-        conn.close()
\ No newline at end of file
+import asyncio
+import json
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+class DatabaseManager:
+    def __init__(self, db_path, batch_size=500):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.readers = queue.LifoQueue()
+        self.writes = queue.Queue()
+        self.writer = None
+        self.lock = threading.Lock()
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute('PRAGMA busy_timeout = 5000')
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def init_db(self):
+        conn = self.connect()
+        conn.execute('PRAGMA journal_mode=WAL')
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY,
+                timestamp TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                keywords TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created TEXT NOT NULL,
+                filename TEXT NOT NULL,
+                keywords TEXT NOT NULL,
+                status TEXT NOT NULL,
+                total INTEGER,
+                done INTEGER NOT NULL DEFAULT 0,
+                error TEXT,
+                finished TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS job_results (
+                id INTEGER PRIMARY KEY,
+                job_id TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                path TEXT,
+                keyword TEXT,
+                message TEXT,
+                timestamp TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS hits (
+                id INTEGER PRIMARY KEY,
+                request_id INTEGER NOT NULL,
+                path TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                count INTEGER,
+                part TEXT,
+                offset INTEGER,
+                timestamp TEXT NOT NULL
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_scans (
+                sha256 TEXT NOT NULL,
+                version TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                timestamp TEXT NOT NULL,
+                PRIMARY KEY (sha256, version, keyword)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS file_hits (
+                id INTEGER PRIMARY KEY,
+                sha256 TEXT NOT NULL,
+                version TEXT NOT NULL,
+                keyword TEXT NOT NULL,
+                member TEXT NOT NULL,
+                part TEXT,
+                offset INTEGER,
+                count INTEGER
+            )
+        ''')
+        self.add_columns(conn, 'requests', {
+            'size': 'INTEGER', 'sha256': 'TEXT', 'status': 'TEXT', 'hits': 'INTEGER', 'errors': 'INTEGER',
+            'finished': 'TEXT'
+        })
+        self.add_columns(conn, 'jobs', {'request_id': 'INTEGER'})
+        cursor.execute('CREATE INDEX IF NOT EXISTS job_results_job_id ON job_results (job_id, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS requests_timestamp ON requests (timestamp)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS hits_request_id ON hits (request_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS hits_keyword_request ON hits (keyword, request_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS hits_path_request ON hits (path, request_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS file_hits_sha256 ON file_hits (sha256, version, keyword)')
+        conn.commit()
+        conn.close()
+
+    def add_columns(self, conn, table, columns):
+        existing = {row['name'] for row in conn.execute(f'PRAGMA table_info({table})')}
+        for name, column_type in columns.items():
+            if name not in existing:
+                conn.execute(f'ALTER TABLE {table} ADD COLUMN {name} {column_type}')
+
+    def start(self):
+        with self.lock:
+            if self.writer is None:
+                self.init_db()
+                self.writer = threading.Thread(target=self.run_writer, name='database-writer', daemon=True)
+                self.writer.start()
+
+    def close(self):
+        with self.lock:
+            writer, self.writer = self.writer, None
+        if writer is not None:
+            self.writes.put(None)
+            writer.join()
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+
+    def submit(self, operation, *args):
+        self.start()
+        future = Future()
+        self.writes.put((operation, args, future))
+        return future
+
+    async def write(self, operation, *args):
+        return await asyncio.wrap_future(self.submit(operation, *args))
+
+    def run_writer(self):
+        conn = self.connect()
+        closing = False
+        while not closing:
+            batch = [self.writes.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.writes.get_nowait())
+                except queue.Empty:
+                    break
+            results = []
+            for item in batch:
+                if item is None:
+                    closing = True
+                    continue
+                operation, args, future = item
+                try:
+                    results.append((future, operation(conn, *args), None))
+                except Exception as e:
+                    results.append((future, None, e))
+            try:
+                conn.commit()
+            except Exception as e:
+                results = [(future, None, e) for future, _, _ in results]
+            for future, result, error in results:
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+        conn.close()
+
+    def run_read(self, operation, *args):
+        try:
+            conn = self.readers.get_nowait()
+        except queue.Empty:
+            conn = self.connect()
+        try:
+            return operation(conn, *args)
+        finally:
+            self.readers.put(conn)
+
+    async def read(self, operation, *args):
+        return await asyncio.to_thread(self.run_read, operation, *args)
+
+    async def log_request(self, filename, keywords, size=None, sha256=None):
+        def insert(conn):
+            return conn.execute('''
+                INSERT INTO requests (timestamp, filename, keywords, size, sha256, status)
+                VALUES (?, ?, ?, ?, ?, 'running')
+            ''', (datetime.now().isoformat(), filename, ','.join(keywords), size, sha256)).lastrowid
+        return await self.write(insert)
+
+    async def finish_request(self, request_id, status='done', **fields):
+        fields['status'] = status
+        fields['finished'] = datetime.now().isoformat()
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+
+        def update(conn):
+            conn.execute(f'''
+                UPDATE requests SET {assignments}, hits = (SELECT COUNT(*) FROM hits WHERE request_id = ?)
+                WHERE id = ?
+            ''', (*fields.values(), request_id, request_id))
+        await self.write(update)
+
+    async def create_job(self, job_id, filename, keywords, request_id=None):
+        def insert(conn):
+            conn.execute('''
+                INSERT INTO jobs (id, created, filename, keywords, status, request_id)
+                VALUES (?, ?, ?, ?, 'queued', ?)
+            ''', (job_id, datetime.now().isoformat(), filename, ','.join(keywords), request_id))
+        await self.write(insert)
+
+    async def update_job(self, job_id, **fields):
+        if fields.get('status') in ('done', 'failed'):
+            fields['finished'] = datetime.now().isoformat()
+        assignments = ', '.join(f'{column} = ?' for column in fields)
+
+        def update(conn):
+            conn.execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*fields.values(), job_id))
+        await self.write(update)
+
+    async def get_job(self, job_id):
+        def select(conn):
+            row = conn.execute('SELECT * FROM jobs WHERE id = ?', (job_id,)).fetchone()
+            return dict(row) if row is not None else None
+        return await self.read(select)
+
+    def add_job_results(self, job_id, records):
+        rows = [
+            (job_id, record.kind, record.path, getattr(record, 'keyword', None), getattr(record, 'message', None),
+             record.timestamp)
+            for record in records
+        ]
+        return self.submit(lambda conn: conn.executemany('''
+            INSERT INTO job_results (job_id, kind, path, keyword, message, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', rows))
+
+    def add_hits(self, request_id, records):
+        rows = [
+            (request_id, record.path, record.part, record.keyword, record.offset, record.count, record.timestamp)
+            for record in records if record.kind == 'hit'
+        ]
+        if not rows:
+            return None
+        return self.submit(lambda conn: conn.executemany('''
+            INSERT INTO hits (request_id, path, part, keyword, offset, count, timestamp)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', rows))
+
+    async def get_job_results(self, job_id, offset, limit):
+        def select(conn):
+            total = conn.execute('SELECT COUNT(*) FROM job_results WHERE job_id = ?', (job_id,)).fetchone()[0]
+            rows = conn.execute('''
+                SELECT kind, path, keyword, message, timestamp FROM job_results
+                WHERE job_id = ? ORDER BY id LIMIT ? OFFSET ?
+            ''', (job_id, limit, offset)).fetchall()
+            return total, [dict(row) for row in rows]
+        return await self.read(select)
+
+    async def get_requests(self, offset, limit, status=None):
+        where, params = ('WHERE status = ?', (status,)) if status else ('', ())
+
+        def select(conn):
+            total = conn.execute(f'SELECT COUNT(*) FROM requests {where}', params).fetchone()[0]
+            rows = conn.execute(f'''
+                SELECT * FROM requests {where} ORDER BY id DESC LIMIT ? OFFSET ?
+            ''', (*params, limit, offset)).fetchall()
+            return total, [dict(row) for row in rows]
+        return await self.read(select)
+
+    async def get_request(self, request_id):
+        def select(conn):
+            row = conn.execute('SELECT * FROM requests WHERE id = ?', (request_id,)).fetchone()
+            return dict(row) if row is not None else None
+        return await self.read(select)
+
+    async def get_hits(self, offset, limit, request_id=None, keyword=None, path=None, part=None):
+        filters = {'request_id': request_id, 'keyword': keyword, 'path': path, 'part': part}
+        filters = {column: value for column, value in filters.items() if value is not None}
+        where = 'WHERE ' + ' AND '.join(f'{column} = ?' for column in filters) if filters else ''
+
+        def select(conn):
+            total = conn.execute(f'SELECT COUNT(*) FROM hits {where}', tuple(filters.values())).fetchone()[0]
+            rows = conn.execute(f'''
+                SELECT request_id, path, part, keyword, offset, count, timestamp FROM hits {where}
+                ORDER BY id LIMIT ? OFFSET ?
+            ''', (*filters.values(), limit, offset)).fetchall()
+            return total, [dict(row) for row in rows]
+        return await self.read(select)
+
+    async def top_files(self, keyword, scans, limit):
+        def select(conn):
+            rows = conn.execute('''
+                SELECT path, COUNT(DISTINCT request_id) AS scans, SUM(COALESCE(count, 1)) AS hits,
+                       MAX(request_id) AS last_request_id
+                FROM hits
+                WHERE keyword = ? AND request_id >= (
+                    SELECT COALESCE(MIN(id), 0) FROM (SELECT id FROM requests ORDER BY id DESC LIMIT ?)
+                )
+                GROUP BY path ORDER BY scans DESC, hits DESC, path LIMIT ?
+            ''', (keyword, scans, limit)).fetchall()
+            return [dict(row) for row in rows]
+        return await self.read(select)
+
+    async def top_keywords(self, scans, limit):
+        def select(conn):
+            rows = conn.execute('''
+                SELECT keyword, COUNT(DISTINCT request_id) AS scans, COUNT(DISTINCT path) AS files,
+                       SUM(COALESCE(count, 1)) AS hits
+                FROM hits
+                WHERE request_id >= (
+                    SELECT COALESCE(MIN(id), 0) FROM (SELECT id FROM requests ORDER BY id DESC LIMIT ?)
+                )
+                GROUP BY keyword ORDER BY files DESC, hits DESC, keyword LIMIT ?
+            ''', (scans, limit)).fetchall()
+            return [dict(row) for row in rows]
+        return await self.read(select)
+
+    async def unknown_hashes(self, hashes, keywords, version):
+        def select(conn):
+            known = {row[0] for row in conn.execute('''
+                SELECT sha256 FROM file_scans
+                WHERE sha256 IN (SELECT value FROM json_each(?)) AND version = ?
+                      AND keyword IN (SELECT value FROM json_each(?))
+                GROUP BY sha256 HAVING COUNT(*) = ?
+            ''', (json.dumps(hashes), version, json.dumps(keywords), len(keywords)))}
+            return [sha256 for sha256 in hashes if sha256 not in known]
+        return await self.read(select)
+
+    async def store_file_results(self, hashes, keywords, version, rows):
+        timestamp = datetime.now().isoformat()
+
+        def store(conn):
+            conn.execute('''
+                DELETE FROM file_hits
+                WHERE sha256 IN (SELECT value FROM json_each(?)) AND version = ?
+                      AND keyword IN (SELECT value FROM json_each(?))
+            ''', (json.dumps(hashes), version, json.dumps(keywords)))
+            conn.executemany('''
+                INSERT INTO file_hits (sha256, version, keyword, member, part, offset, count)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', [(sha256, version, keyword, member, part, offset, count)
+                  for sha256, keyword, member, part, offset, count in rows])
+            conn.executemany('''
+                INSERT OR REPLACE INTO file_scans (sha256, version, keyword, timestamp) VALUES (?, ?, ?, ?)
+            ''', [(sha256, version, keyword, timestamp) for sha256 in hashes for keyword in keywords])
+        await self.write(store)
+
+    async def get_file_results(self, hashes, keywords, version):
+        def select(conn):
+            rows = conn.execute('''
+                SELECT sha256, keyword, member, part, offset, count FROM file_hits
+                WHERE sha256 IN (SELECT value FROM json_each(?)) AND version = ?
+                      AND keyword IN (SELECT value FROM json_each(?))
+                ORDER BY id
+            ''', (json.dumps(hashes), version, json.dumps(keywords))).fetchall()
+            return [dict(row) for row in rows]
+        return await self.read(select)
@@ -1,33 +1,39 @@
 import os
 import argparse
-import patoolib
 import concurrent.futures
+from archives import ArchiveWalker, DEFAULT_MAX_DEPTH
 
-def extract_and_remove_archive(file_path):
+def extract_and_remove_archive(file_path, walker):
     try:
-        if os.path.isfile(file_path):
-            patoolib.extract_archive(file_path, outdir=os.path.dirname(file_path))
+        if os.path.isfile(file_path) and walker.kind(file_path, file_path):
+            output_dir = os.path.dirname(file_path)
+            for name, data in walker.walk(file_path, file_path, prefix=""):
+                member_path = os.path.join(output_dir, name)
+                os.makedirs(os.path.dirname(member_path), exist_ok=True)
+                with open(member_path, "wb") as member_file:
+                    member_file.write(data)
             os.remove(file_path)
             print(f'Розархівовано та видалено архів: {file_path}')
-            print(f'Каталог розархівації: {os.path.dirname(file_path)}')
+            print(f'Каталог розархівації: {output_dir}')
     except Exception as e:
-        pass
+        print(f'Помилка розархівації {file_path}: {e}')
 
-def process_directory(directory):
+def process_directory(directory, walker):
     with concurrent.futures.ThreadPoolExecutor() as executor:
         for root, _, files in os.walk(directory):
             for file in files:
                 file_path = os.path.join(root, file)
-                executor.submit(extract_and_remove_archive, file_path)
+                executor.submit(extract_and_remove_archive, file_path, walker)
 
 def main():
     parser = argparse.ArgumentParser(description='Розархівація файлів у вказаній директорії')
     parser.add_argument('directory', type=str, help='Шлях до директорії для обробки')
+    parser.add_argument('--depth', type=int, default=DEFAULT_MAX_DEPTH, help='Максимальна глибина вкладених архівів')
     args = parser.parse_args()
 
     directory = args.directory
     if os.path.exists(directory):
-        process_directory(directory)
+        process_directory(directory, ArchiveWalker(args.depth))
     else:
         print("Зазначена директорія не існує.")
 if __name__ == "__main__":
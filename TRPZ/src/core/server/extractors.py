@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+import codecs
+import csv
+import io
+import re
+import zipfile
+
+EXTRACTOR_VERSION = "3"
+DEFAULT_ENGINE = "native"
+ENGINES = ("native", "legacy")
+CHUNK_SIZE = 1024 * 1024
+CSV_FIELD_SIZE_LIMIT = 2 ** 31 - 1
+FILE_EXTENSIONS = {"txt", "docx", "pdf", "csv", "xlsx", "xml"}
+ATTACHMENT_EXTENSIONS = {"txt", "docx", "pdf", "xml", "csv", "xlsx", "js", "css", "html", "json", "tsv"}
+PLAIN_TEXT_EXTENSIONS = {"txt", "js", "css", "html", "json", "tsv"}
+
+
+def open_source(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return source
+
+
+def open_binary(source):
+    if isinstance(source, (bytes, bytearray)):
+        return io.BytesIO(source)
+    return open(source, "rb")
+
+
+def read_bytes(source):
+    if isinstance(source, (bytes, bytearray)):
+        return bytes(source)
+    with open(source, "rb") as file:
+        return file.read()
+
+
+def batch_lines(lines, size=CHUNK_SIZE):
+    batch = []
+    length = 0
+    for line in lines:
+        batch.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(batch)
+            batch = []
+            length = 0
+    if batch:
+        yield "".join(batch)
+
+
+def iter_plain_text(source):
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    with open_binary(source) as stream:
+        for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            text = decoder.decode(block)
+            if text:
+                yield text
+        text = decoder.decode(b"", final=True)
+        if text:
+            yield text
+
+
+def extract_plain_text(source):
+    return read_bytes(source).decode("utf-8")
+
+
+def extract_docx(source):
+    import docx
+    doc = docx.Document(open_source(source))
+    return "\n".join([paragraph.text for paragraph in doc.paragraphs])
+
+
+def local_name(tag):
+    return tag.rsplit("}", 1)[-1]
+
+
+def natural_key(name):
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", name)]
+
+
+def iter_docx_part(stream):
+    import xml.etree.ElementTree as ET
+    runs = []
+    for event, element in ET.iterparse(stream, events=("end",)):
+        name = local_name(element.tag)
+        if name == "t" and element.text:
+            runs.append(element.text)
+        elif name == "tab":
+            runs.append("\t")
+        elif name in ("br", "cr"):
+            runs.append("\n")
+        elif name == "p":
+            runs.append("\n")
+            yield "".join(runs)
+            runs = []
+            element.clear()
+
+
+def iter_docx_text(source):
+    with zipfile.ZipFile(open_source(source)) as archive:
+        names = archive.namelist()
+        headers = sorted((name for name in names if re.fullmatch(r"word/header\d*\.xml", name)), key=natural_key)
+        footers = sorted((name for name in names if re.fullmatch(r"word/footer\d*\.xml", name)), key=natural_key)
+        notes = [name for name in ("word/footnotes.xml", "word/endnotes.xml") if name in names]
+        for name in headers + ["word/document.xml"] + notes + footers:
+            with archive.open(name) as stream:
+                yield from batch_lines(iter_docx_part(stream))
+
+
+def read_shared_strings(archive):
+    import xml.etree.ElementTree as ET
+    if "xl/sharedStrings.xml" not in archive.namelist():
+        return []
+    strings = []
+    with archive.open("xl/sharedStrings.xml") as stream:
+        for event, element in ET.iterparse(stream, events=("end",)):
+            if local_name(element.tag) == "si":
+                strings.append("".join(
+                    child.text or "" for child in element.iter() if local_name(child.tag) == "t"
+                ))
+                element.clear()
+    return strings
+
+
+def iter_sheet_rows(stream, shared_strings):
+    import xml.etree.ElementTree as ET
+    values = []
+    for event, element in ET.iterparse(stream, events=("end",)):
+        name = local_name(element.tag)
+        if name == "c":
+            cell_type = element.get("t")
+            value = None
+            if cell_type == "inlineStr":
+                value = "".join(child.text or "" for child in element.iter() if local_name(child.tag) == "t")
+            else:
+                for child in element:
+                    if local_name(child.tag) == "v":
+                        value = child.text
+                if value is not None and cell_type == "s":
+                    value = shared_strings[int(value)]
+            if value:
+                values.append(value)
+            element.clear()
+        elif name == "row":
+            if values:
+                yield "\t".join(values) + "\n"
+            values = []
+            element.clear()
+
+
+def iter_xlsx_text(source):
+    with zipfile.ZipFile(open_source(source)) as archive:
+        shared_strings = read_shared_strings(archive)
+        sheets = sorted(
+            (name for name in archive.namelist() if re.fullmatch(r"xl/worksheets/sheet\d*\.xml", name)),
+            key=natural_key
+        )
+        for name in sheets:
+            with archive.open(name) as stream:
+                yield from batch_lines(iter_sheet_rows(stream, shared_strings))
+
+
+def iter_delimited_text(source, delimiter=","):
+    csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+    with open_binary(source) as binary:
+        text = io.TextIOWrapper(binary, encoding="utf-8", newline="")
+        rows = csv.reader(text, delimiter=delimiter)
+        yield from batch_lines("\t".join(row) + "\n" for row in rows)
+
+
+def iter_tsv_text(source):
+    return iter_delimited_text(source, "\t")
+
+
+def iter_xml_text(source):
+    from xml.parsers import expat
+    pending = []
+    parser = expat.ParserCreate()
+    parser.buffer_text = True
+    parser.StartElementHandler = lambda name, attributes: pending.extend(
+        value + "\n" for value in attributes.values()
+    )
+    parser.EndElementHandler = lambda name: pending.append("\n")
+    parser.CharacterDataHandler = pending.append
+    with open_binary(source) as stream:
+        for block in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            parser.Parse(block, False)
+            if pending:
+                yield "".join(pending)
+                pending.clear()
+        parser.Parse(b"", True)
+        if pending:
+            yield "".join(pending)
+
+
+def iter_pdf_text(source):
+    import fitz
+    if isinstance(source, (bytes, bytearray)):
+        pdf_document = fitz.open(stream=source, filetype="pdf")
+    else:
+        pdf_document = fitz.open(source)
+    with pdf_document:
+        for page_num in range(pdf_document.page_count):
+            yield pdf_document.load_page(page_num).get_text()
+
+
+def extract_pdf(source):
+    return "".join(iter_pdf_text(source))
+
+
+def extract_csv(source):
+    import pandas as pd
+    df = pd.read_csv(open_source(source))
+    return df.to_string(index=False)
+
+
+def extract_xlsx(source):
+    import pandas as pd
+    df = pd.read_excel(open_source(source))
+    return df.to_string(index=False)
+
+
+def extract_xml(source):
+    import xml.etree.ElementTree as ET
+    root = ET.parse(open_source(source)).getroot()
+    return ET.tostring(root, encoding="utf-8").decode("utf-8")
+
+
+EXTRACTORS = {
+    "docx": extract_docx,
+    "pdf": extract_pdf,
+    "csv": extract_csv,
+    "xlsx": extract_xlsx,
+    "xml": extract_xml,
+}
+EXTRACTORS.update({extension: extract_plain_text for extension in PLAIN_TEXT_EXTENSIONS})
+STREAMING_EXTRACTORS = {
+    "pdf": iter_pdf_text,
+}
+STREAMING_EXTRACTORS.update({extension: iter_plain_text for extension in PLAIN_TEXT_EXTENSIONS})
+NATIVE_EXTRACTORS = {
+    "docx": iter_docx_text,
+    "xlsx": iter_xlsx_text,
+    "csv": iter_delimited_text,
+    "tsv": iter_tsv_text,
+    "xml": iter_xml_text,
+}
+
+
+def iter_text(extension, source, engine=DEFAULT_ENGINE):
+    if engine == "native" and extension in NATIVE_EXTRACTORS:
+        yield from NATIVE_EXTRACTORS[extension](source)
+        return
+    if extension in STREAMING_EXTRACTORS:
+        yield from STREAMING_EXTRACTORS[extension](source)
+        return
+    extractor = EXTRACTORS.get(extension)
+    if extractor is not None:
+        content = extractor(source)
+        if content:
+            yield content
+
+
+def extract_text(extension, source, engine=DEFAULT_ENGINE):
+    if extension not in EXTRACTORS:
+        return None
+    return "".join(iter_text(extension, source, engine))
+
+
+def iter_cached_text(extension, source, cache, engine=DEFAULT_ENGINE):
+    key = cache.key(f"{engine}/{extension}", source)
+    cached = cache.read(key)
+    if cached is not None:
+        yield from cached
+        return
+
+    writer = cache.writer(key)
+    try:
+        for chunk in iter_text(extension, source, engine):
+            writer.write(chunk)
+            yield chunk
+        writer.commit()
+    finally:
+        writer.discard()
+
+
+def iter_source_text(extension, source, cache=None, engine=DEFAULT_ENGINE):
+    if cache is not None:
+        return iter_cached_text(extension, source, cache, engine)
+    return iter_text(extension, source, engine)
+
+
+def extract_source(extension, source, cache=None, engine=DEFAULT_ENGINE):
+    if extension not in EXTRACTORS:
+        return None
+    return "".join(iter_source_text(extension, source, cache, engine))
+
+
+def scan_source(extension, source, matcher, cache=None, engine=DEFAULT_ENGINE, exhaustive=False):
+    if extension not in EXTRACTORS:
+        return []
+    scanner = matcher.scanner(exhaustive)
+    chunks = iter_source_text(extension, source, cache, engine)
+    try:
+        for chunk in chunks:
+            if not scanner.satisfied:
+                scanner.feed(chunk)
+            elif cache is None:
+                break
+    finally:
+        chunks.close()
+    return scanner.results()
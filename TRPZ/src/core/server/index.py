@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+
+class TextIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.create_function("contains_folded", 2, contains_folded, deterministic=True)
+        self.init_db()
+
+    def init_db(self):
+        with self.lock:
+            self.conn.execute('PRAGMA journal_mode=WAL')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS indexed_files (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    indexed_at TEXT NOT NULL
+                )
+            ''')
+            self.conn.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS documents
+                USING fts5(path UNINDEXED, part UNINDEXED, content, tokenize='trigram')
+            ''')
+            self.conn.commit()
+
+    def is_current(self, path, stat):
+        with self.lock:
+            row = self.conn.execute('SELECT size, mtime FROM indexed_files WHERE path = ?', (path,)).fetchone()
+        return row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime
+
+    def replace(self, path, stat, documents):
+        with self.lock:
+            self.conn.execute('DELETE FROM documents WHERE path = ?', (path,))
+            self.conn.executemany(
+                'INSERT INTO documents (path, part, content) VALUES (?, ?, ?)',
+                [(path, part, content) for part, content in documents if content]
+            )
+            self.conn.execute('''
+                INSERT OR REPLACE INTO indexed_files (path, size, mtime, indexed_at)
+                VALUES (?, ?, ?, ?)
+            ''', (path, stat.st_size, stat.st_mtime, datetime.now().isoformat()))
+
+    def prune(self, folder_path, seen_paths):
+        prefix = os.path.join(os.path.abspath(folder_path), '')
+        with self.lock:
+            rows = self.conn.execute('SELECT path FROM indexed_files WHERE substr(path, 1, ?) = ?',
+                                     (len(prefix), prefix)).fetchall()
+            removed = [(path,) for path, in rows if path not in seen_paths]
+            self.conn.executemany('DELETE FROM documents WHERE path = ?', removed)
+            self.conn.executemany('DELETE FROM indexed_files WHERE path = ?', removed)
+        return len(removed)
+
+    def commit(self):
+        with self.lock:
+            self.conn.commit()
+
+    def query(self, keywords):
+        results = []
+        with self.lock:
+            for keyword in dict.fromkeys(keyword for keyword in keywords if keyword):
+                if len(keyword) >= 3:
+                    rows = self.conn.execute(
+                        'SELECT DISTINCT path, part FROM documents WHERE documents MATCH ?',
+                        ('content:"' + keyword.replace('"', '""') + '"',)
+                    ).fetchall()
+                else:
+                    rows = self.conn.execute(
+                        'SELECT DISTINCT path, part FROM documents WHERE contains_folded(content, ?)', (keyword,)
+                    ).fetchall()
+                results.extend((path, part, keyword) for path, part in rows)
+        return results
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+def hit_path(path, part):
+    return path if part in ("body", "file") else os.path.join(path, part)
+
+
+def contains_folded(content, keyword):
+    return keyword.casefold() in content.casefold()
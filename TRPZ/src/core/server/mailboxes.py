@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import json
+import mmap
+import os
+import posixpath
+from functools import lru_cache, partial
+from archives import ArchiveMember
+
+MBOX_EXTENSIONS = {"mbox", "mbx"}
+MAILDIR_FOLDERS = ("cur", "new")
+MAILDIR_SIBLINGS = ("cur", "new", "tmp")
+INDEX_SUFFIX = ".idx"
+SEPARATOR = b"\nFrom "
+HEADER = b"From "
+
+
+@lru_cache(maxsize=1024)
+def is_maildir(folder):
+    return all(os.path.isdir(os.path.join(folder, name)) for name in MAILDIR_FOLDERS)
+
+
+def is_maildir_message(path, folders=None):
+    if folders is not None:
+        folder = posixpath.dirname(path)
+        parent, name = posixpath.split(folder)
+        return name in MAILDIR_FOLDERS and any(
+            posixpath.join(parent, sibling) in folders for sibling in MAILDIR_SIBLINGS if sibling != name)
+    folder = os.path.dirname(path)
+    return os.path.basename(folder) in MAILDIR_FOLDERS and is_maildir(os.path.dirname(folder))
+
+
+def is_mbox(name, source):
+    if name.endswith(".eml"):
+        return False
+    if os.path.splitext(name)[1].lstrip(".").lower() in MBOX_EXTENSIONS:
+        return True
+    if isinstance(source, (bytes, bytearray)):
+        return source[:len(HEADER)] == HEADER
+    with open(source, "rb") as file:
+        return file.read(len(HEADER)) == HEADER
+
+
+def find_offsets(buffer, start=0):
+    offsets = [0] if start == 0 and buffer[:len(HEADER)] == HEADER else []
+    position = buffer.find(SEPARATOR, start)
+    while position != -1:
+        offsets.append(position + 1)
+        position = buffer.find(SEPARATOR, position + 1)
+    return offsets
+
+
+class MboxIndex:
+    def __init__(self, path, directory):
+        self.path = path
+        self.directory = directory
+        name = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()
+        self.index_path = os.path.join(directory, name + INDEX_SUFFIX)
+
+    def load(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as index_file:
+                return json.load(index_file)
+        except (OSError, ValueError):
+            return None
+
+    def save(self, stat, offsets):
+        temp_path = f"{self.index_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(temp_path, "w", encoding="utf-8") as index_file:
+                json.dump({"size": stat.st_size, "mtime": stat.st_mtime, "offsets": offsets}, index_file)
+            os.replace(temp_path, self.index_path)
+        except OSError:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+    def offsets(self, buffer, stat):
+        stored = self.load()
+        if stored is not None and stored["size"] == stat.st_size and stored["mtime"] == stat.st_mtime:
+            return stored["offsets"]
+
+        last = stored["offsets"][-1] if stored is not None and stored["offsets"] else None
+        if last is not None and stored["size"] <= stat.st_size and buffer[last:last + len(HEADER)] == HEADER \
+                and (last == 0 or buffer[last - 1:last] == b"\n"):
+            offsets = stored["offsets"] + find_offsets(buffer, last + 1)
+        else:
+            offsets = find_offsets(buffer)
+        self.save(stat, offsets)
+        return offsets
+
+
+class Mbox:
+    def __init__(self, path, data=None, index_directory=None):
+        self.path = path
+        self.data = data
+        self.index_directory = index_directory
+        self.file = None
+        self.buffer = data
+
+    def __enter__(self):
+        if self.data is None:
+            self.file = open(self.path, "rb")
+            if os.fstat(self.file.fileno()).st_size:
+                self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.file is not None:
+            if self.buffer is not None:
+                self.buffer.close()
+            self.file.close()
+
+    def offsets(self):
+        if self.buffer is None:
+            return []
+        if self.file is None or self.index_directory is None:
+            return find_offsets(self.buffer)
+        return MboxIndex(self.path, self.index_directory).offsets(self.buffer, os.fstat(self.file.fileno()))
+
+    def read(self, start, end):
+        return self.buffer[start:end]
+
+    def members(self, offsets, depth=0):
+        ends = offsets[1:] + [len(self.buffer) if self.buffer is not None else 0]
+        for number, (start, end) in enumerate(zip(offsets, ends), 1):
+            yield ArchiveMember(f"{self.path}/{number}.eml", partial(self.read, start, end), depth)
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+import re
+from collections import deque
+from functools import lru_cache
+
+MATCHER_CACHE_SIZE = 16
+
+
+def unique_keywords(keywords):
+    return tuple(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+
+@lru_cache(maxsize=MATCHER_CACHE_SIZE)
+def cached_matcher(keywords):
+    return KeywordMatcher(keywords)
+
+
+def install_matcher(keywords):
+    cached_matcher(unique_keywords(keywords))
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        self.keywords = list(unique_keywords(keywords))
+
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]
+        self.lengths = []
+        for index, keyword in enumerate(self.keywords):
+            pattern = keyword.casefold()
+            self.lengths.append(len(pattern))
+            self._add(pattern, index)
+        self._build()
+        first_chars = ''.join(self.goto[0])
+        self.start = re.compile('[' + ''.join(re.escape(char) for char in first_chars) + ']') if first_chars else None
+
+    def _add(self, pattern, index):
+        state = 0
+        for char in pattern:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto[state][char] = next_state
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+            state = next_state
+        self.output[state].append(index)
+
+    def _build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                target = self.goto[fallback].get(char, 0)
+                self.fail[next_state] = target if target != next_state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def __reduce__(self):
+        return cached_matcher, (tuple(self.keywords),)
+
+    def __bool__(self):
+        return bool(self.keywords)
+
+    def __len__(self):
+        return len(self.keywords)
+
+    def scanner(self, count=False):
+        return KeywordScanner(self, count)
+
+    def find(self, text):
+        scanner = self.scanner()
+        scanner.feed(text)
+        return scanner.found_keywords()
+
+
+class KeywordScanner:
+    def __init__(self, matcher, count=False):
+        self.matcher = matcher
+        self.state = 0
+        self.offset = 0
+        self.found = set()
+        self.offsets = [None] * len(matcher.keywords)
+        self.counts = [0] * len(matcher.keywords) if count else None
+
+    @property
+    def satisfied(self):
+        return self.counts is None and self.complete
+
+    @property
+    def complete(self):
+        return len(self.found) == len(self.matcher.keywords)
+
+    def feed(self, text):
+        goto = self.matcher.goto
+        fail = self.matcher.fail
+        output = self.matcher.output
+        start = self.matcher.start
+        keywords = self.matcher.keywords
+        lengths = self.matcher.lengths
+        counts = self.counts
+        total = len(keywords)
+        state = self.state
+        new_hits = []
+        folded = text.casefold()
+        position = 0
+        length = len(folded)
+        while position < length and start is not None:
+            if not state:
+                match = start.search(folded, position)
+                if match is None:
+                    break
+                position = match.start()
+            char = folded[position]
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                for index in output[state]:
+                    if counts is not None:
+                        counts[index] += 1
+                    if index not in self.found:
+                        self.found.add(index)
+                        self.offsets[index] = self.offset + position - lengths[index] + 1
+                        new_hits.append(keywords[index])
+                if counts is None and len(self.found) == total:
+                    break
+            position += 1
+        self.state = state
+        self.offset += length
+        return new_hits
+
+    def found_keywords(self):
+        return [self.matcher.keywords[index] for index in sorted(self.found)]
+
+    def results(self):
+        return [
+            (self.matcher.keywords[index], self.counts[index] if self.counts is not None else None,
+             self.offsets[index])
+            for index in sorted(self.found)
+        ]
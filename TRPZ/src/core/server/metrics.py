@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DESCRIPTIONS = {
+    "email_parser_extract_seconds": ("histogram", "Time spent extracting and matching one document, by extension"),
+    "email_parser_stage_seconds": ("histogram", "Time spent in each scan stage"),
+    "email_parser_request_seconds": ("histogram", "HTTP request latency, by endpoint"),
+    "email_parser_files_total": ("counter", "Files processed, by type"),
+    "email_parser_bytes_total": ("counter", "Bytes of documents passed to extractors, by extension"),
+    "email_parser_hits_total": ("counter", "Keyword hits, by keyword"),
+    "email_parser_errors_total": ("counter", "Errors, by exception type"),
+    "email_parser_requests_total": ("counter", "HTTP requests, by endpoint and status"),
+    "email_parser_queue_depth": ("gauge", "Items waiting in scan queues"),
+    "email_parser_active_workers": ("gauge", "Scan workers currently processing an item"),
+}
+
+
+def label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def escape_label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in pairs) + "}"
+
+
+class Metrics:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.enabled = False
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.values = {}
+        self.histograms = {}
+
+    def enable(self):
+        self.enabled = True
+        self.started = time.time()
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.values[(name, label_key(labels))] = value
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = (name, label_key(labels))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = [0] * len(self.buckets) + [0, 0.0]
+            for position, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram[position] += 1
+            histogram[-2] += 1
+            histogram[-1] += value
+
+    def render(self):
+        with self.lock:
+            values = sorted(self.values.items())
+            histograms = sorted((key, list(histogram)) for key, histogram in self.histograms.items())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described and name in DESCRIPTIONS:
+                metric_type, description = DESCRIPTIONS[name]
+                lines.append(f"# HELP {name} {description}")
+                lines.append(f"# TYPE {name} {metric_type}")
+            described.add(name)
+
+        for (name, labels), value in values:
+            describe(name)
+            lines.append(f"{name}{format_labels(labels)} {value}")
+        for (name, labels), histogram in histograms:
+            describe(name)
+            for bound, count in zip(self.buckets, histogram):
+                lines.append(f"{name}_bucket{format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_bucket{format_labels(labels, [('le', '+Inf')])} {histogram[-2]}")
+            lines.append(f"{name}_count{format_labels(labels)} {histogram[-2]}")
+            lines.append(f"{name}_sum{format_labels(labels)} {histogram[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        with self.lock:
+            values = sorted(self.values.items())
+            histograms = sorted((key, list(histogram)) for key, histogram in self.histograms.items())
+        summary = {"uptime_seconds": time.time() - self.started, "metrics": {}}
+        for (name, labels), value in values:
+            summary["metrics"].setdefault(name, []).append({"labels": dict(labels), "value": value})
+        for (name, labels), histogram in histograms:
+            count, total = histogram[-2], histogram[-1]
+            summary["metrics"].setdefault(name, []).append({
+                "labels": dict(labels),
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "buckets": {str(bound): value for bound, value in zip(self.buckets, histogram)},
+            })
+        return summary
+
+
+metrics = Metrics()
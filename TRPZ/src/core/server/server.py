@@ -1,90 +1,651 @@
-# -*- coding: utf-8 -*-
-from fastapi import FastAPI, UploadFile, File, Form
-import aiofiles
-import os
-import shutil
-import zipfile
-from core2 import search_keywords_in_emails
-from abc import ABC, abstractmethod
-from typing import List
-from database import DatabaseManager
-
-app = FastAPI()
-db_manager = DatabaseManager('requests.db')
-
-
-class ArchiveProcessor(ABC):
-    @abstractmethod
-    def extract(self, archive_path: str, destination: str) -> None:
-        pass
-
-class ZipArchiveProcessor(ArchiveProcessor):
-    def extract(self, archive_path: str, destination: str) -> None:
-        with zipfile.ZipFile(archive_path, 'r') as zip_ref:
-            zip_ref.extractall(destination)
-
-class DirectoryProcessor(ABC):
-    @abstractmethod
-    async def process_directory(
-        self, directory_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
-    ) -> None:
-        pass
-
-class EmailProcessor(DirectoryProcessor):
-    async def process_directory(
-        self, directory_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
-    ) -> None:
-        await search_keywords_in_emails(directory_path, log_file, error_file, keywords, output_folder, flag)
-
-class ArchiveProcessorBridge:
-    def __init__(self, archive_processor: ArchiveProcessor, directory_processor: DirectoryProcessor):
-        self.archive_processor = archive_processor
-        self.directory_processor = directory_processor
-
-    async def process_archive(
-        self, archive_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
-    ) -> None:
-        temp_directory = "temp_directory"
-        self.archive_processor.extract(archive_path, temp_directory)
-        await self.directory_processor.process_directory(temp_directory, log_file, error_file, keywords, output_folder, flag)
-
-
-
-@app.post("/process-directory/")
-async def process_directory(archive: UploadFile = File(...), keywords: str = Form(...)):
-    archive_path = f"temp_{archive.filename}"
-    log_file = "log.txt"
-    error_file = "errors.txt"
-    output_folder = "output_folder"
-    await db_manager.log_request(archive.filename, keywords.split(','))
-    open(log_file, 'w').close()
-    open(error_file, 'w').close()
-
-    async with aiofiles.open(archive_path, "wb") as out_file:
-        content = await archive.read()
-        await out_file.write(content)
-
-    archive_processor = ZipArchiveProcessor()
-    directory_processor = EmailProcessor()
-
-    bridge = ArchiveProcessorBridge(archive_processor, directory_processor)
-    await bridge.process_archive(archive_path, log_file, error_file, keywords.split(','), output_folder, False)
-
-    log_content = ""
-    if os.path.exists(log_file):
-        async with aiofiles.open(log_file, "r", encoding="utf-8") as log:
-            log_content = await log.read()
-
-    errors_content = ""
-    if os.path.exists(error_file):
-        async with aiofiles.open(error_file, "r", encoding="utf-8") as errors:
-            errors_content = await errors.read()
-
-    os.remove(archive_path)
-    shutil.rmtree("temp_directory")
-
-    return {"message": "Directory processed", "log": log_content, "errors": errors_content}
-
-if __name__ == "__main__":
-    import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8009)
+# -*- coding: utf-8 -*-
+from fastapi import FastAPI, UploadFile, File, Form, Body, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import aiofiles
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import uuid
+import zipfile
+from concurrent.futures import Executor, ProcessPoolExecutor
+from contextlib import contextmanager
+from core2 import search_keywords_in_emails, scan_sources, DEFAULT_CONCURRENCY
+from archives import ArchiveError, ArchiveMember, ArchiveWalker, DEFAULT_MAX_DEPTH
+from cache import TextCache, DEFAULT_CACHE_SIZE
+from extractors import EXTRACTOR_VERSION, DEFAULT_ENGINE
+from index import TextIndex, hit_path
+from sink import Hit, ScanError, ResultFormat, ResultSink, QueueFormat, TextLogFormat, format_hit
+from abc import ABC, abstractmethod
+from typing import Callable, Iterable, Iterator, List, Optional
+from database import DatabaseManager
+from metrics import metrics
+
+app = FastAPI()
+db_manager = DatabaseManager('requests.db')
+extraction_workers = int(os.environ.get("EMAIL_PARSER_WORKERS", os.cpu_count() or 1))
+scan_concurrency = int(os.environ.get("EMAIL_PARSER_CONCURRENCY", DEFAULT_CONCURRENCY))
+cache_directory = os.environ.get("EMAIL_PARSER_CACHE_DIR")
+cache_size = int(os.environ.get("EMAIL_PARSER_CACHE_MB", DEFAULT_CACHE_SIZE // (1024 * 1024))) * 1024 * 1024
+text_cache = TextCache(cache_directory, EXTRACTOR_VERSION, cache_size) if cache_directory else None
+mbox_index_directory = os.environ.get("EMAIL_PARSER_MBOX_INDEX_DIR") or (
+    os.path.join(cache_directory, "mbox") if cache_directory else None)
+extraction_engine = os.environ.get("EMAIL_PARSER_ENGINE", DEFAULT_ENGINE)
+count_all_hits = os.environ.get("EMAIL_PARSER_ALL_HITS", "0") == "1"
+max_upload_size = int(os.environ.get("EMAIL_PARSER_MAX_UPLOAD_MB", 0)) * 1024 * 1024
+hash_uploads = os.environ.get("EMAIL_PARSER_HASH_UPLOADS", "1") != "0"
+archive_walker = ArchiveWalker(int(os.environ.get("EMAIL_PARSER_ARCHIVE_DEPTH", DEFAULT_MAX_DEPTH)))
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+STREAM_QUEUE_SIZE = 64
+MANIFEST_NAME = "manifest.json"
+MANIFEST_KINDS = ("email", "file")
+INVALID_ARCHIVE = "Unsupported or corrupted archive"
+ARCHIVE_ERRORS = (ArchiveError, zipfile.BadZipFile, tarfile.TarError)
+result_version = (f"{EXTRACTOR_VERSION}/{extraction_engine}/{archive_walker.max_depth}/"
+                  f"{'all' if count_all_hits else 'first'}")
+job_workers = int(os.environ.get("EMAIL_PARSER_JOB_WORKERS", 2))
+job_slots = asyncio.Semaphore(max(1, job_workers))
+running_jobs = set()
+work_root = os.environ.get("EMAIL_PARSER_WORK_DIR") or None
+index_path = os.environ.get("EMAIL_PARSER_INDEX")
+text_index = TextIndex(index_path) if index_path else None
+executor = None
+if os.environ.get("EMAIL_PARSER_METRICS", "0") == "1":
+    metrics.enable()
+
+
+@app.on_event("startup")
+async def start_executor():
+    global executor
+    db_manager.start()
+    if extraction_workers > 0:
+        executor = ProcessPoolExecutor(max_workers=extraction_workers)
+
+
+@app.on_event("shutdown")
+async def stop_executor():
+    if executor is not None:
+        executor.shutdown()
+    await asyncio.to_thread(db_manager.close)
+
+
+if metrics.enabled:
+    @app.middleware("http")
+    async def observe_request(request: Request, call_next):
+        started = time.perf_counter()
+        status = 500
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            route = request.scope.get("route")
+            endpoint = route.path if route is not None else "unmatched"
+            metrics.observe("email_parser_request_seconds", time.perf_counter() - started, endpoint=endpoint)
+            metrics.inc("email_parser_requests_total", endpoint=endpoint, status=status)
+
+
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+class ArchiveProcessor(ABC):
+    @abstractmethod
+    def members(self, archive_path: str) -> Iterator[Iterable[ArchiveMember]]:
+        pass
+
+class ZipArchiveProcessor(ArchiveProcessor):
+    def __init__(self, walker: ArchiveWalker = archive_walker):
+        self.walker = walker
+
+    @contextmanager
+    def members(self, archive_path: str) -> Iterator[Iterable[ArchiveMember]]:
+        with self.walker.open(archive_path, archive_path, prefix="") as members:
+            yield members
+
+class ManifestArchiveProcessor(ZipArchiveProcessor):
+    def __init__(self, members: dict, walker: ArchiveWalker = archive_walker):
+        super().__init__(walker)
+        self.kinds = {name: kind for name, (_, kind) in members.items()}
+
+    @contextmanager
+    def members(self, archive_path: str) -> Iterator[Iterable[ArchiveMember]]:
+        with super().members(archive_path) as members:
+            selected = [member for member in members if member.name in self.kinds]
+            for member in selected:
+                member.email = self.kinds[member.name] == "email"
+            yield selected
+
+class DirectoryProcessor(ABC):
+    @abstractmethod
+    async def process_directory(
+        self, directory_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
+    ) -> None:
+        pass
+
+    @abstractmethod
+    async def process_members(
+        self, members: Iterable[ArchiveMember], log_file: str, error_file: str, keywords: List[str],
+        output_folder: str, flag: bool
+    ) -> None:
+        pass
+
+class EmailProcessor(DirectoryProcessor):
+    def __init__(self, executor: Optional[Executor] = None, concurrency: int = DEFAULT_CONCURRENCY,
+                 cache: Optional[TextCache] = None, sink: Optional[ResultSink] = None,
+                 progress: Optional[Callable[[], None]] = None, engine: str = DEFAULT_ENGINE,
+                 exhaustive: bool = False, walker: Optional[ArchiveWalker] = archive_walker,
+                 mbox_index: Optional[str] = mbox_index_directory):
+        self.executor = executor
+        self.concurrency = concurrency
+        self.cache = cache
+        self.sink = sink
+        self.progress = progress
+        self.engine = engine
+        self.exhaustive = exhaustive
+        self.walker = walker
+        self.mbox_index = mbox_index
+
+    async def process_directory(
+        self, directory_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
+    ) -> None:
+        await search_keywords_in_emails(directory_path, log_file, error_file, keywords, output_folder, flag,
+                                        self.executor, self.concurrency, self.sink, self.cache, self.engine,
+                                        self.exhaustive, self.walker, self.mbox_index)
+
+    async def process_members(
+        self, members: Iterable[ArchiveMember], log_file: str, error_file: str, keywords: List[str],
+        output_folder: str, flag: bool
+    ) -> None:
+        await scan_sources(members, log_file, error_file, keywords, output_folder, flag, self.executor,
+                           self.concurrency, self.sink, self.cache, self.progress, self.engine, self.exhaustive,
+                           self.walker, self.mbox_index)
+
+class ArchiveProcessorBridge:
+    def __init__(self, archive_processor: ArchiveProcessor, directory_processor: DirectoryProcessor):
+        self.archive_processor = archive_processor
+        self.directory_processor = directory_processor
+
+    async def process_archive(
+        self, archive_path: str, log_file: str, error_file: str, keywords: List[str], output_folder: str, flag: bool
+    ) -> None:
+        with self.archive_processor.members(archive_path) as members:
+            await self.directory_processor.process_members(members, log_file, error_file, keywords, output_folder, flag)
+
+class JobResultFormat(ResultFormat):
+    def __init__(self, db_manager: DatabaseManager, job_id: str):
+        self.db_manager = db_manager
+        self.job_id = job_id
+
+    def write(self, records) -> None:
+        self.db_manager.add_job_results(self.job_id, records)
+
+class RequestResultFormat(ResultFormat):
+    def __init__(self, db_manager: DatabaseManager, request_id: int):
+        self.db_manager = db_manager
+        self.request_id = request_id
+        self.errors = 0
+
+    def write(self, records) -> None:
+        self.errors += sum(1 for record in records if record.kind == ScanError.kind)
+        self.db_manager.add_hits(self.request_id, records)
+
+
+class ManifestResultFormat(ResultFormat):
+    def __init__(self, members: dict):
+        self.members = {key: name for name, key in members.items()}
+        self.rows = []
+        self.errors = []
+        self.failed = set()
+
+    def write(self, records) -> None:
+        for record in records:
+            key = member_key(record.path or "")
+            if record.kind == ScanError.kind:
+                self.errors.append(record)
+                self.failed.add(key)
+            elif key in self.members:
+                member = record.path[len(self.members[key]):]
+                self.rows.append((key, record.keyword, member, record.part, record.offset, record.count))
+
+
+@contextmanager
+def archive_errors():
+    try:
+        yield
+    except ARCHIVE_ERRORS as e:
+        raise HTTPException(status_code=400, detail=INVALID_ARCHIVE) from e
+
+
+def check_archive(archive_path: str) -> None:
+    with archive_errors(), ZipArchiveProcessor().members(archive_path):
+        pass
+
+
+def create_work_directory() -> str:
+    if work_root is not None:
+        os.makedirs(work_root, exist_ok=True)
+    return tempfile.mkdtemp(prefix="scan_", dir=work_root)
+
+
+async def save_upload(upload: UploadFile, destination: str, max_size: int = 0, digest=None) -> int:
+    size = 0
+    try:
+        async with aiofiles.open(destination, "wb") as out_file:
+            while True:
+                chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_size and size > max_size:
+                    raise HTTPException(status_code=413, detail="Archive is too large")
+                if digest is not None:
+                    digest.update(chunk)
+                await out_file.write(chunk)
+    except BaseException:
+        if os.path.exists(destination):
+            os.remove(destination)
+        raise
+    return size
+
+
+def unique_keywords(keywords: Iterable[str]) -> List[str]:
+    return list(dict.fromkeys(keyword for keyword in keywords if keyword))
+
+
+def file_key(entry) -> tuple:
+    if not isinstance(entry, dict) or not isinstance(entry.get("sha256"), str) \
+            or entry.get("kind", "file") not in MANIFEST_KINDS:
+        raise HTTPException(status_code=400, detail="Manifest is missing or invalid")
+    return entry["sha256"], entry.get("kind", "file")
+
+
+def member_key(name: str) -> tuple:
+    parts = name.split("/", 2)
+    return (parts[0], parts[1]) if len(parts) == 3 and parts[1] in MANIFEST_KINDS else (parts[0], None)
+
+
+def kind_version(kind: str) -> str:
+    return f"{result_version}/{kind}"
+
+
+async def unknown_files(keys: Iterable[tuple], keywords: List[str]) -> List[tuple]:
+    unknown = []
+    for kind in MANIFEST_KINDS:
+        hashes = list(dict.fromkeys(sha256 for sha256, key_kind in keys if key_kind == kind))
+        if hashes:
+            unknown.extend((sha256, kind) for sha256 in await db_manager.unknown_hashes(hashes, keywords,
+                                                                                       kind_version(kind)))
+    return unknown
+
+
+def read_manifest(archive_path: str):
+    with zipfile.ZipFile(archive_path, 'r') as zip_ref:
+        try:
+            manifest = json.loads(zip_ref.read(MANIFEST_NAME))
+        except (KeyError, ValueError):
+            raise HTTPException(status_code=400, detail="Manifest is missing or invalid")
+        if not isinstance(manifest, list):
+            raise HTTPException(status_code=400, detail="Manifest is missing or invalid")
+        for entry in manifest:
+            file_key(entry)
+            if not isinstance(entry.get("path"), str):
+                raise HTTPException(status_code=400, detail="Manifest is missing or invalid")
+        members = {}
+        mismatched = []
+        for info in zip_ref.infolist():
+            if info.is_dir() or info.filename == MANIFEST_NAME:
+                continue
+            digest = hashlib.sha256()
+            size = 0
+            try:
+                archive_walker.check_size(info.filename, info.file_size)
+                with zip_ref.open(info) as member:
+                    for chunk in iter(lambda: member.read(UPLOAD_CHUNK_SIZE), b""):
+                        size += len(chunk)
+                        archive_walker.check_size(info.filename, size)
+                        digest.update(chunk)
+            except ArchiveError as e:
+                raise HTTPException(status_code=400, detail=f"Archive member is too large: {info.filename}") from e
+            key = member_key(info.filename)
+            if key[0] == digest.hexdigest() and key[1] is not None:
+                members[info.filename] = key
+            else:
+                mismatched.append(info.filename)
+    return manifest, members, mismatched
+
+
+def stream_record(record) -> str:
+    data = record.to_dict()
+    if record.kind == Hit.kind:
+        data["line"] = format_hit(record).rstrip("\n")
+    return json.dumps(data, ensure_ascii=False) + "\n"
+
+
+async def stream_archive(work_directory: str, archive_path: str, keywords: List[str], output_folder: str,
+                         request_id: int, size: Optional[int] = None, digest=None):
+    queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+    queue_format = QueueFormat(asyncio.get_running_loop(), queue)
+    request_format = RequestResultFormat(db_manager, request_id)
+
+    async def scan():
+        try:
+            async with ResultSink([queue_format, request_format]) as sink:
+                directory_processor = EmailProcessor(executor, scan_concurrency, text_cache, sink,
+                                                     engine=extraction_engine, exhaustive=count_all_hits)
+                bridge = ArchiveProcessorBridge(ZipArchiveProcessor(), directory_processor)
+                await bridge.process_archive(archive_path, None, None, keywords, output_folder, False)
+        finally:
+            if not queue_format.aborted:
+                await queue.put(None)
+
+    task = asyncio.create_task(scan())
+    finished = False
+    try:
+        while True:
+            records = await queue.get()
+            if records is None:
+                break
+            yield "".join(stream_record(record) for record in records)
+        status = "done"
+        try:
+            await task
+        except Exception as e:
+            status = "failed"
+            yield json.dumps({"type": "error", "path": None, "message": f"{str(e)}\n"}, ensure_ascii=False) + "\n"
+        await db_manager.finish_request(request_id, status, errors=request_format.errors, size=size,
+                                        sha256=digest.hexdigest() if digest is not None else None)
+        finished = True
+        done = {"type": "done", "message": "Directory processed"}
+        if digest is not None:
+            done["sha256"] = digest.hexdigest()
+        yield json.dumps(done, ensure_ascii=False) + "\n"
+    finally:
+        queue_format.abort()
+        task.cancel()
+        shutil.rmtree(work_directory, ignore_errors=True)
+        if not finished:
+            await db_manager.finish_request(request_id, "failed", errors=request_format.errors, size=size)
+
+
+@app.post("/process-directory/")
+async def process_directory(archive: UploadFile = File(...), keywords: str = Form(...), stream: bool = Form(False)):
+    work_directory = create_work_directory()
+    archive_path = os.path.join(work_directory, "archive.zip")
+    log_file = os.path.join(work_directory, "log.txt")
+    error_file = os.path.join(work_directory, "errors.txt")
+    output_folder = os.path.join(work_directory, "output_folder")
+    streaming = False
+    request_id = None
+    try:
+        request_id = await db_manager.log_request(archive.filename, keywords.split(','))
+
+        digest = hashlib.sha256() if hash_uploads else None
+        size = await save_upload(archive, archive_path, max_upload_size, digest)
+        await asyncio.to_thread(check_archive, archive_path)
+        if stream:
+            response = StreamingResponse(
+                stream_archive(work_directory, archive_path, keywords.split(','), output_folder, request_id, size,
+                               digest),
+                media_type="application/x-ndjson"
+            )
+            streaming = True
+            return response
+
+        request_format = RequestResultFormat(db_manager, request_id)
+        async with ResultSink([TextLogFormat(log_file, error_file), request_format]) as sink:
+            archive_processor = ZipArchiveProcessor()
+            directory_processor = EmailProcessor(executor, scan_concurrency, text_cache, sink,
+                                                 engine=extraction_engine, exhaustive=count_all_hits)
+
+            bridge = ArchiveProcessorBridge(archive_processor, directory_processor)
+            await bridge.process_archive(archive_path, log_file, error_file, keywords.split(','), output_folder,
+                                         False)
+        await db_manager.finish_request(request_id, errors=request_format.errors, size=size,
+                                        sha256=digest.hexdigest() if digest is not None else None)
+
+        log_content = ""
+        if os.path.exists(log_file):
+            async with aiofiles.open(log_file, "r", encoding="utf-8") as log:
+                log_content = await log.read()
+
+        errors_content = ""
+        if os.path.exists(error_file):
+            async with aiofiles.open(error_file, "r", encoding="utf-8") as errors:
+                errors_content = await errors.read()
+
+        response = {"message": "Directory processed", "log": log_content, "errors": errors_content}
+        if digest is not None:
+            response["sha256"] = digest.hexdigest()
+        return response
+    except BaseException:
+        if request_id is not None and not streaming:
+            await db_manager.finish_request(request_id, "failed")
+        raise
+    finally:
+        if not streaming:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+@app.post("/manifest/")
+async def check_manifest(keywords: List[str] = Body(...), files: List[dict] = Body(...)):
+    unknown = await unknown_files([file_key(entry) for entry in files], unique_keywords(keywords))
+    return {"unknown": [{"sha256": sha256, "kind": kind} for sha256, kind in unknown]}
+
+
+@app.post("/process-manifest/")
+async def process_manifest(archive: UploadFile = File(...), keywords: str = Form(...)):
+    work_directory = create_work_directory()
+    archive_path = os.path.join(work_directory, "archive.zip")
+    keyword_list = unique_keywords(keywords.split(','))
+    request_id = None
+    try:
+        request_id = await db_manager.log_request(archive.filename, keyword_list)
+        size = await save_upload(archive, archive_path, max_upload_size)
+        with archive_errors():
+            manifest, members, mismatched = await asyncio.to_thread(read_manifest, archive_path)
+
+        paths = {}
+        for entry in manifest:
+            paths.setdefault(file_key(entry), []).append(entry["path"])
+        result_format = ManifestResultFormat(members)
+        if members:
+            async with ResultSink([result_format]) as sink:
+                directory_processor = EmailProcessor(executor, scan_concurrency, text_cache, sink,
+                                                     engine=extraction_engine, exhaustive=count_all_hits)
+                bridge = ArchiveProcessorBridge(ManifestArchiveProcessor(members), directory_processor)
+                await bridge.process_archive(archive_path, None, None, keyword_list,
+                                             os.path.join(work_directory, "output_folder"), False)
+            for kind in MANIFEST_KINDS:
+                scanned = [sha256 for sha256, key_kind in set(members.values())
+                           if key_kind == kind and (sha256, kind) not in result_format.failed]
+                rows = [(key[0], *row) for key, *row in result_format.rows
+                        if key[1] == kind and key not in result_format.failed]
+                if scanned:
+                    await db_manager.store_file_results(scanned, keyword_list, kind_version(kind), rows)
+
+        results = {}
+        for kind in MANIFEST_KINDS:
+            hashes = [sha256 for sha256, key_kind in paths if key_kind == kind]
+            if hashes:
+                for row in await db_manager.get_file_results(hashes, keyword_list, kind_version(kind)):
+                    results.setdefault((row["sha256"], kind), []).append(row)
+        hits = [
+            Hit(entry["path"] + row["member"], row["keyword"], row["count"], row["part"], row["offset"])
+            for entry in manifest for row in results.get(file_key(entry), [])
+        ]
+        db_manager.add_hits(request_id, hits)
+
+        errors = []
+        for error in result_format.errors:
+            message = error.message
+            key = member_key(error.path or "")
+            if key in result_format.members and key in paths:
+                message = message.replace(result_format.members[key], paths[key][0])
+            errors.append(message)
+        rejected = set(result_format.failed)
+        for name in mismatched:
+            key = member_key(name)
+            rejected.add(key)
+            errors.extend(f"Контрольна сума не збігається: {path}\n" for path in paths.get(key, [name]))
+        missing = set(await unknown_files(list(paths), keyword_list))
+        errors.extend(f"Файл не передано на сервер: {path}\n"
+                      for key in missing - rejected for path in paths[key])
+
+        await db_manager.finish_request(request_id, errors=len(errors), size=size)
+        return {"message": "Manifest processed", "log": "".join(format_hit(hit) for hit in hits),
+                "errors": "".join(errors), "files": len(manifest), "uploaded": len(members)}
+    except BaseException:
+        if request_id is not None:
+            await db_manager.finish_request(request_id, "failed")
+        raise
+    finally:
+        shutil.rmtree(work_directory, ignore_errors=True)
+
+async def run_job(job_id: str, work_directory: str, keywords: List[str], request_id: int):
+    archive_path = os.path.join(work_directory, "archive.zip")
+    async with job_slots:
+        done = 0
+        reported = 0
+
+        def progress():
+            nonlocal done
+            done += 1
+
+        async def report_progress():
+            nonlocal reported
+            while True:
+                await asyncio.sleep(1)
+                if done != reported:
+                    reported = done
+                    await db_manager.update_job(job_id, done=done)
+
+        reporter = None
+        try:
+            with ZipArchiveProcessor().members(archive_path) as members:
+                total = len(members)
+            await db_manager.update_job(job_id, status="running", total=total)
+            reporter = asyncio.create_task(report_progress())
+
+            request_format = RequestResultFormat(db_manager, request_id)
+            async with ResultSink([JobResultFormat(db_manager, job_id), request_format]) as sink:
+                directory_processor = EmailProcessor(executor, scan_concurrency, text_cache, sink, progress,
+                                                     extraction_engine, count_all_hits)
+                bridge = ArchiveProcessorBridge(ZipArchiveProcessor(), directory_processor)
+                await bridge.process_archive(archive_path, None, None, keywords, work_directory, False)
+            reporter.cancel()
+            await db_manager.update_job(job_id, status="done", done=done)
+            await db_manager.finish_request(request_id, errors=request_format.errors)
+        except Exception as e:
+            if reporter is not None:
+                reporter.cancel()
+            await db_manager.update_job(job_id, status="failed", done=done,
+                                        error=INVALID_ARCHIVE if isinstance(e, ARCHIVE_ERRORS) else str(e))
+            await db_manager.finish_request(request_id, "failed")
+        finally:
+            shutil.rmtree(work_directory, ignore_errors=True)
+
+
+@app.post("/jobs/")
+async def submit_job(archive: UploadFile = File(...), keywords: str = Form(...)):
+    job_id = uuid.uuid4().hex
+    work_directory = create_work_directory()
+    try:
+        await save_upload(archive, os.path.join(work_directory, "archive.zip"), max_upload_size)
+    except BaseException:
+        shutil.rmtree(work_directory, ignore_errors=True)
+        raise
+
+    request_id = await db_manager.log_request(archive.filename, keywords.split(','))
+    await db_manager.create_job(job_id, archive.filename, keywords.split(','), request_id)
+    task = asyncio.create_task(run_job(job_id, work_directory, keywords.split(','), request_id))
+    running_jobs.add(task)
+    task.add_done_callback(running_jobs.discard)
+    return {"job_id": job_id, "status": "queued"}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await db_manager.get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@app.get("/jobs/{job_id}/results")
+async def get_job_results(job_id: str, offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    if await db_manager.get_job(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    total, results = await db_manager.get_job_results(job_id, offset, limit)
+    return {"job_id": job_id, "offset": offset, "limit": limit, "total": total, "results": results}
+
+
+@app.get("/requests")
+async def get_requests(offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000),
+                       status: Optional[str] = None):
+    total, requests = await db_manager.get_requests(offset, limit, status)
+    return {"offset": offset, "limit": limit, "total": total, "requests": requests}
+
+
+@app.get("/requests/{request_id}")
+async def get_request(request_id: int):
+    request = await db_manager.get_request(request_id)
+    if request is None:
+        raise HTTPException(status_code=404, detail="Request not found")
+    return request
+
+
+@app.get("/requests/{request_id}/hits")
+async def get_request_hits(request_id: int, keyword: Optional[str] = None, path: Optional[str] = None,
+                           offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    if await db_manager.get_request(request_id) is None:
+        raise HTTPException(status_code=404, detail="Request not found")
+    total, hits = await db_manager.get_hits(offset, limit, request_id=request_id, keyword=keyword, path=path)
+    return {"request_id": request_id, "offset": offset, "limit": limit, "total": total, "hits": hits}
+
+
+@app.get("/hits")
+async def get_hits(keyword: Optional[str] = None, path: Optional[str] = None, part: Optional[str] = None,
+                   offset: int = Query(0, ge=0), limit: int = Query(100, ge=1, le=1000)):
+    total, hits = await db_manager.get_hits(offset, limit, keyword=keyword, path=path, part=part)
+    return {"offset": offset, "limit": limit, "total": total, "hits": hits}
+
+
+@app.get("/hits/top-files")
+async def get_top_files(keyword: str, scans: int = Query(10, ge=1, le=1000), limit: int = Query(10, ge=1, le=1000)):
+    files = await db_manager.top_files(keyword, scans, limit)
+    return {"keyword": keyword, "scans": scans, "files": files}
+
+
+@app.get("/hits/top-keywords")
+async def get_top_keywords(scans: int = Query(10, ge=1, le=1000), limit: int = Query(10, ge=1, le=1000)):
+    keywords = await db_manager.top_keywords(scans, limit)
+    return {"scans": scans, "keywords": keywords}
+
+
+@app.post("/index/query/")
+async def query_index(keywords: str = Form(...)):
+    if text_index is None:
+        raise HTTPException(status_code=503, detail="Index is not configured")
+    request_id = await db_manager.log_request(index_path, keywords.split(','))
+
+    results = await asyncio.to_thread(text_index.query, keywords.split(','))
+    hits = [Hit(hit_path(path, part), keyword, part=part) for path, part, keyword in results]
+    db_manager.add_hits(request_id, hits)
+    await db_manager.finish_request(request_id, errors=0)
+    log_content = "".join(format_hit(hit) for hit in hits)
+    return {"message": "Index queried", "log": log_content, "errors": ""}
+
+if __name__ == "__main__":
+    import uvicorn
+    http_workers = int(os.environ.get("EMAIL_PARSER_HTTP_WORKERS", 1))
+    if http_workers > 1:
+        uvicorn.run("server:app", host="0.0.0.0", port=8009, workers=http_workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8009)
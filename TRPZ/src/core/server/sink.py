@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import concurrent.futures
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from metrics import metrics
+
+
+class Hit:
+    kind = "hit"
+
+    def __init__(self, path, keyword, count=None, part=None, offset=None):
+        self.path = path
+        self.keyword = keyword
+        self.count = count
+        self.part = part
+        self.offset = offset
+        self.timestamp = datetime.now().isoformat()
+
+    def to_dict(self):
+        data = {"type": self.kind, "path": self.path, "keyword": self.keyword, "timestamp": self.timestamp}
+        for field in ("count", "part", "offset"):
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+
+class ScanError:
+    kind = "error"
+
+    def __init__(self, message, path=None):
+        self.message = message
+        self.path = path
+        self.timestamp = datetime.now().isoformat()
+
+    def to_dict(self):
+        return {"type": self.kind, "path": self.path, "message": self.message, "timestamp": self.timestamp}
+
+
+def short_path(filename):
+    drive, path = os.path.splitdrive(filename)
+    dirs, filename = os.path.split(path)
+    _, dirs = os.path.split(dirs)
+    return os.path.join(os.path.sep, dirs, filename)
+
+
+def format_hit(hit):
+    if hit.count is not None:
+        return f"Файл: {short_path(hit.path)}, Ключевое слово: {hit.keyword}, Кількість: {hit.count}\n"
+    return f"Файл: {short_path(hit.path)}, Ключевое слово: {hit.keyword}\n"
+
+
+class ResultFormat(ABC):
+    @abstractmethod
+    def write(self, records) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class TextLogFormat(ResultFormat):
+    def __init__(self, log_file, error_file):
+        self.log_file = log_file
+        self.error_file = error_file
+        self.log = None
+        self.errors = None
+
+    def write(self, records):
+        hits = [record for record in records if record.kind == Hit.kind]
+        errors = [record for record in records if record.kind == ScanError.kind]
+        if hits:
+            if self.log is None:
+                self.log = open(self.log_file, "a", encoding="utf-8")
+            self.log.writelines(format_hit(hit) for hit in hits)
+            self.log.flush()
+        if errors:
+            if self.errors is None:
+                self.errors = open(self.error_file, "a", encoding="utf-8")
+            self.errors.writelines(error.message for error in errors)
+            self.errors.flush()
+
+    def close(self):
+        for file in (self.log, self.errors):
+            if file is not None:
+                file.close()
+        self.log = None
+        self.errors = None
+
+
+class JsonLinesFormat(ResultFormat):
+    def __init__(self, path):
+        self.path = path
+        self.file = None
+
+    def write(self, records):
+        if self.file is None:
+            self.file = open(self.path, "a", encoding="utf-8")
+        self.file.writelines(json.dumps(record.to_dict(), ensure_ascii=False) + "\n" for record in records)
+        self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class QueueFormat(ResultFormat):
+    def __init__(self, loop, queue):
+        self.loop = loop
+        self.queue = queue
+        self.lock = threading.Lock()
+        self.pending = None
+        self.aborted = False
+
+    def write(self, records):
+        with self.lock:
+            if self.aborted:
+                return
+            self.pending = asyncio.run_coroutine_threadsafe(self.queue.put(list(records)), self.loop)
+        try:
+            self.pending.result()
+        except concurrent.futures.CancelledError:
+            pass
+
+    def abort(self):
+        with self.lock:
+            self.aborted = True
+            if self.pending is not None:
+                self.pending.cancel()
+
+
+class ResultSink:
+    def __init__(self, formats, batch_size=500, queue_size=10000):
+        self.formats = formats
+        self.batch_size = batch_size
+        self.queue = asyncio.Queue(maxsize=queue_size)
+        self.writer = None
+
+    async def __aenter__(self):
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def start(self):
+        if self.writer is None:
+            self.writer = asyncio.create_task(self.run())
+
+    async def add(self, record):
+        await self.queue.put(record)
+
+    async def close(self):
+        if self.writer is not None:
+            await self.queue.put(None)
+            await self.writer
+            self.writer = None
+
+    async def run(self):
+        try:
+            closing = False
+            while not closing:
+                batch = []
+                record = await self.queue.get()
+                while True:
+                    if record is None:
+                        closing = True
+                        break
+                    batch.append(record)
+                    if len(batch) >= self.batch_size or self.queue.empty():
+                        break
+                    record = self.queue.get_nowait()
+                if batch:
+                    try:
+                        await asyncio.to_thread(self.write, batch)
+                    except Exception as e:
+                        print(f"Помилка запису результатів: {str(e)}")
+        finally:
+            for result_format in self.formats:
+                result_format.close()
+
+    def write(self, records):
+        started = time.perf_counter()
+        for result_format in self.formats:
+            result_format.write(records)
+        metrics.observe("email_parser_stage_seconds", time.perf_counter() - started, stage="write")